@@ -2,8 +2,12 @@ import bpy
 from .ui import LIGGGHTS_PT_MainPanel
 from .operators.generate_rigid_input import LIGGGHTS_OT_GenerateRigidInput
 from .operators.generate_deformable_input import LIGGGHTS_OT_GenerateDeformableInput
+from .operators import import_dump, import_forces
 from .utils.file_writer import write_setup_file, write_run_file
-from .utils.generate_input import LIGGGHTS_OT_GenerateInput
+from .utils.generate_input import LIGGGHTS_OT_GenerateInput, calculate_world_bounds, scene_cost_estimate, scene_stable_timestep
+from .utils.mesh_utils import count_triangles
+from .utils.timestep import describe_timestep, rigid_max_speed
+from .utils.transform_sampling import sample_world_matrices
 
 bl_info = {
     "name": "LIGGGHTS Addon",
@@ -20,6 +24,8 @@ bl_info = {
 
 class LIGGGHTS_MovingObjectItem(bpy.types.PropertyGroup):
     name: bpy.props.StringProperty(name="Object Name")
+    triangles: bpy.props.IntProperty(name="Triangles")
+    triangles_decimated: bpy.props.IntProperty(name="Decimated Triangles")
 
 def get_timestep_str(self):
     return "{:.6e}".format(self.liggghts_timestep)
@@ -51,6 +57,197 @@ def register_properties():
     bpy.types.Scene.liggghts_cohesion = bpy.props.FloatProperty(name="Cohesion", default=75000)
     bpy.types.Scene.liggghts_poisson_ratio = bpy.props.FloatProperty(name="Poisson Ratio", default=0.4)
     bpy.types.Scene.liggghts_framerate = bpy.props.FloatProperty(name="Framerate", default=250.0, precision=1)
+    bpy.types.Scene.liggghts_density = bpy.props.FloatProperty(name="Density", default=1200.0, min=0.0)
+    bpy.types.Scene.liggghts_auto_timestep = bpy.props.BoolProperty(
+        name="Auto Timestep",
+        default=False,
+        description="Compute the largest stable timestep that divides the frame duration exactly when generating"
+    )
+    bpy.types.Scene.liggghts_timestep_safety = bpy.props.FloatProperty(
+        name="Safety Factor",
+        default=0.2,
+        min=0.01,
+        max=1.0,
+        description="Fraction of the smaller of the Rayleigh and Hertz critical timesteps to use"
+    )
+    bpy.types.Scene.liggghts_max_core_hours = bpy.props.FloatProperty(
+        name="Max Core-Hours",
+        default=0.0,
+        min=0.0,
+        description="Refuse to generate scenes whose estimated cost exceeds this many core-hours (0 for no limit)"
+    )
+    bpy.types.Scene.liggghts_tight_domain = bpy.props.BoolProperty(
+        name="Tight Domain",
+        default=False,
+        description="Replace the simulation volume with the box swept by the tray, insertion volume and moving objects over the animation"
+    )
+    bpy.types.Scene.liggghts_domain_padding = bpy.props.FloatProperty(
+        name="Domain Padding",
+        default=5.0,
+        min=0.0,
+        description="Padding around the swept volume, in particle radii"
+    )
+    bpy.types.Scene.liggghts_settle_early = bpy.props.BoolProperty(
+        name="Stop Settling at Rest",
+        default=False,
+        description="End the settling run once the bed is full and its kinetic energy drops below the rest threshold. The loop uses jump SELF, so setup.liggghts must be run with -in, not from stdin"
+    )
+    bpy.types.Scene.liggghts_settle_speed = bpy.props.FloatProperty(
+        name="Rest Speed",
+        default=0.001,
+        min=0.0,
+        precision=5,
+        description="The bed counts as at rest when its kinetic energy is below every particle moving at this speed"
+    )
+    bpy.types.Scene.liggghts_settle_block = bpy.props.IntProperty(
+        name="Settle Block",
+        default=10000,
+        min=1,
+        description="Steps between kinetic energy checks, rounded up to whole insertion intervals"
+    )
+    bpy.types.Scene.liggghts_settle_max_steps = bpy.props.IntProperty(
+        name="Max Settle Steps",
+        default=200000,
+        min=1,
+        description="Hard cap on the steps of the settling run"
+    )
+    bpy.types.Scene.liggghts_restart_cache_dir = bpy.props.StringProperty(
+        name="Restart Cache",
+        default="",
+        subtype='DIR_PATH',
+        description="Directory of settled beds keyed by their setup fingerprint, reused when only the motion changes (empty to disable)"
+    )
+    bpy.types.Scene.liggghts_dump_every_frames = bpy.props.IntProperty(
+        name="Dump Every",
+        default=1,
+        min=1,
+        description="Blender frames between particle and mesh dumps of the run"
+    )
+    bpy.types.Scene.liggghts_dump_format = bpy.props.EnumProperty(
+        name="Dump Format",
+        items=[
+            ('TEXT', "Text", "Plain text custom dump"),
+            ('GZIP', "Gzipped Text", "Text dump compressed on the fly; LIGGGHTS must be built with -DLAMMPS_GZIP"),
+            ('BINARY', "Binary", "Binary custom dump, the smallest and fastest to write"),
+        ],
+        default='TEXT'
+    )
+    bpy.types.Scene.liggghts_dump_fields = bpy.props.EnumProperty(
+        name="Dump Fields",
+        items=[
+            ('ID', "ID", "Particle id"),
+            ('TYPE', "Type", "Atom type"),
+            ('POSITION', "Position", "x y z"),
+            ('VELOCITY', "Velocity", "vx vy vz"),
+            ('FORCE', "Force", "fx fy fz"),
+            ('OMEGA', "Angular Velocity", "omegax omegay omegaz"),
+            ('RADIUS', "Radius", "Particle radius"),
+        ],
+        options={'ENUM_FLAG'},
+        default={'ID', 'POSITION', 'RADIUS'},
+        description="Per-particle values written to the dump; none leaves the particle dump out"
+    )
+    bpy.types.Scene.liggghts_dump_near_objects = bpy.props.BoolProperty(
+        name="Dump Near Moving Objects",
+        default=False,
+        description="Only dump particles inside the volume swept by the moving objects"
+    )
+    bpy.types.Scene.liggghts_dump_region_padding = bpy.props.FloatProperty(
+        name="Dump Region Padding",
+        default=10.0,
+        min=0.0,
+        description="Margin around the moving objects' swept volume, in particle radii"
+    )
+    bpy.types.Scene.liggghts_force_dump = bpy.props.BoolProperty(
+        name="Dump Contact Forces",
+        default=True,
+        description="Dump the particle contacts on the tray and moving meshes of rigid runs for force analysis"
+    )
+    bpy.types.Scene.liggghts_force_dump_every_frames = bpy.props.IntProperty(
+        name="Force Dump Every",
+        default=1,
+        min=1,
+        description="Blender frames between contact force dumps of rigid runs"
+    )
+    bpy.types.Scene.liggghts_cprofile = bpy.props.BoolProperty(
+        name="Write cProfile Stats",
+        default=False,
+        description="Also run generation under cProfile and save liggghts_profile.prof next to the phase timings"
+    )
+    bpy.types.Scene.liggghts_mpi_ranks = bpy.props.IntProperty(
+        name="MPI Ranks",
+        default=1,
+        min=1,
+        description="Number of MPI ranks the simulation will run on; used to plan the processors grid"
+    )
+    bpy.types.Scene.liggghts_stl_ascii = bpy.props.BoolProperty(
+        name="ASCII STL",
+        default=False,
+        description="Write ASCII STL files instead of the smaller, faster binary format"
+    )
+    bpy.types.Scene.liggghts_decimate = bpy.props.BoolProperty(
+        name="Decimate Meshes",
+        default=False,
+        description="Decimate the tray and rigid moving meshes on export towards an edge length derived from the particle radius"
+    )
+    bpy.types.Scene.liggghts_decimate_edge_factor = bpy.props.FloatProperty(
+        name="Edge Length / Radius",
+        default=2.0,
+        min=0.1,
+        description="Target triangle edge length as a multiple of the particle radius"
+    )
+    bpy.types.Scene.liggghts_tray_triangles = bpy.props.IntProperty(name="Tray Triangles")
+    bpy.types.Scene.liggghts_tray_triangles_decimated = bpy.props.IntProperty(name="Decimated Tray Triangles")
+    bpy.types.Scene.liggghts_export_workers = bpy.props.IntProperty(
+        name="Export Workers",
+        default=1,
+        min=1,
+        max=256,
+        description="Number of background Blender processes used to export deformable frames"
+    )
+    bpy.types.Scene.liggghts_deformable_tolerance = bpy.props.FloatProperty(
+        name="Frame Tolerance",
+        default=0.0,
+        min=0.0,
+        precision=6,
+        description="Grid in meters that deformable vertex positions are snapped to when detecting unchanged frames (0 for exact matches)"
+    )
+    bpy.types.Scene.liggghts_motion_mode = bpy.props.EnumProperty(
+        name="Motion Mode",
+        items=[
+            ('SEGMENTS', "Fix Segments", "Emit move/mesh fixes for each segment of constant motion"),
+            ('TABULATED', "Tabulated", "Drive each mesh with one persistent fix reading per-frame velocity tables. The run script loops with jump, so run it with -in rather than on stdin"),
+        ],
+        default='SEGMENTS'
+    )
+    bpy.types.Scene.liggghts_linear_tolerance = bpy.props.FloatProperty(
+        name="Linear Tolerance",
+        default=0.0,
+        min=0.0,
+        precision=6,
+        description="Largest linear velocity change (m/s) merged into one move/mesh segment"
+    )
+    bpy.types.Scene.liggghts_angular_tolerance = bpy.props.FloatProperty(
+        name="Angular Tolerance",
+        default=0.0,
+        min=0.0,
+        precision=6,
+        description="Largest angular velocity change (rad/s) merged into one move/mesh segment"
+    )
+    bpy.types.Scene.liggghts_linear_epsilon = bpy.props.FloatProperty(
+        name="Linear Noise Floor",
+        default=1e-5,
+        min=0.0,
+        precision=6,
+        description="Per-frame linear speeds (m/s) at or below this are treated as no motion"
+    )
+    bpy.types.Scene.liggghts_angular_epsilon = bpy.props.FloatProperty(
+        name="Angular Noise Floor",
+        default=1e-4,
+        min=0.0,
+        precision=6,
+        description="Per-frame angular speeds (rad/s) at or below this are treated as no rotation"
+    )
 
 def unregister_properties():
     del bpy.types.Scene.liggghts_moving_objects
@@ -67,6 +264,38 @@ def unregister_properties():
     del bpy.types.Scene.liggghts_cohesion
     del bpy.types.Scene.liggghts_poisson_ratio
     del bpy.types.Scene.liggghts_framerate
+    del bpy.types.Scene.liggghts_density
+    del bpy.types.Scene.liggghts_auto_timestep
+    del bpy.types.Scene.liggghts_timestep_safety
+    del bpy.types.Scene.liggghts_max_core_hours
+    del bpy.types.Scene.liggghts_tight_domain
+    del bpy.types.Scene.liggghts_domain_padding
+    del bpy.types.Scene.liggghts_settle_early
+    del bpy.types.Scene.liggghts_settle_speed
+    del bpy.types.Scene.liggghts_settle_block
+    del bpy.types.Scene.liggghts_settle_max_steps
+    del bpy.types.Scene.liggghts_restart_cache_dir
+    del bpy.types.Scene.liggghts_dump_every_frames
+    del bpy.types.Scene.liggghts_dump_format
+    del bpy.types.Scene.liggghts_dump_fields
+    del bpy.types.Scene.liggghts_dump_near_objects
+    del bpy.types.Scene.liggghts_dump_region_padding
+    del bpy.types.Scene.liggghts_force_dump
+    del bpy.types.Scene.liggghts_force_dump_every_frames
+    del bpy.types.Scene.liggghts_cprofile
+    del bpy.types.Scene.liggghts_mpi_ranks
+    del bpy.types.Scene.liggghts_stl_ascii
+    del bpy.types.Scene.liggghts_decimate
+    del bpy.types.Scene.liggghts_decimate_edge_factor
+    del bpy.types.Scene.liggghts_tray_triangles
+    del bpy.types.Scene.liggghts_tray_triangles_decimated
+    del bpy.types.Scene.liggghts_export_workers
+    del bpy.types.Scene.liggghts_deformable_tolerance
+    del bpy.types.Scene.liggghts_motion_mode
+    del bpy.types.Scene.liggghts_linear_tolerance
+    del bpy.types.Scene.liggghts_angular_tolerance
+    del bpy.types.Scene.liggghts_linear_epsilon
+    del bpy.types.Scene.liggghts_angular_epsilon
 
     bpy.utils.unregister_class(LIGGGHTS_MovingObjectItem)
 
@@ -129,6 +358,60 @@ class LIGGGHTS_OT_SetSimulationVolume(bpy.types.Operator):
             scene.liggghts_simulation_volume = context.object
         return {'FINISHED'}
 
+class LIGGGHTS_OT_UpdateTriangleCounts(bpy.types.Operator):
+    """Count the triangles of the tray and moving meshes before and after decimation"""
+    bl_idname = "liggghts.update_triangle_counts"
+    bl_label = "Update Triangle Counts"
+
+    def execute(self, context):
+        scene = context.scene
+        edge_length = scene.liggghts_decimate_edge_factor * scene.liggghts_radius if scene.liggghts_decimate else None
+        depsgraph = context.evaluated_depsgraph_get()
+        for item in scene.liggghts_moving_objects:
+            obj = bpy.data.objects.get(item.name)
+            if obj is not None:
+                item.triangles, item.triangles_decimated = count_triangles(obj, edge_length, depsgraph)
+        if scene.liggghts_tray:
+            scene.liggghts_tray_triangles, scene.liggghts_tray_triangles_decimated = count_triangles(scene.liggghts_tray, edge_length, depsgraph)
+        return {'FINISHED'}
+
+class LIGGGHTS_OT_ComputeTimestep(bpy.types.Operator):
+    """Set the timestep to the largest stable value that divides the frame duration exactly"""
+    bl_idname = "liggghts.compute_timestep"
+    bl_label = "Compute Stable Timestep"
+
+    def execute(self, context):
+        scene = context.scene
+        if not scene.liggghts_simulation_volume or not scene.liggghts_insertion_volume:
+            self.report({'ERROR'}, "Set the simulation and insertion volumes first")
+            return {'CANCELLED'}
+        moving_objects = [bpy.data.objects[item.name] for item in scene.liggghts_moving_objects]
+        world_matrices = sample_world_matrices(scene, moving_objects, scene.frame_start, scene.frame_end)
+        object_speed = rigid_max_speed(world_matrices, scene.liggghts_framerate, [obj.bound_box for obj in moving_objects])
+        sim_min, _ = calculate_world_bounds(scene.liggghts_simulation_volume)
+        _, ins_max = calculate_world_bounds(scene.liggghts_insertion_volume)
+        result = scene_stable_timestep(scene, object_speed, sim_min, ins_max)
+        scene.liggghts_timestep = result["timestep"]
+        self.report({'INFO'}, describe_timestep(result))
+        return {'FINISHED'}
+
+class LIGGGHTS_OT_EstimateCost(bpy.types.Operator):
+    """Estimate the memory, runtime and dump output of the simulation and show it in the panel"""
+    bl_idname = "liggghts.estimate_cost"
+    bl_label = "Estimate Cost"
+
+    def execute(self, context):
+        scene = context.scene
+        if not scene.liggghts_simulation_volume or not scene.liggghts_insertion_volume:
+            self.report({'ERROR'}, "Set the simulation and insertion volumes first")
+            return {'CANCELLED'}
+        if scene.liggghts_timestep <= 0:
+            self.report({'ERROR'}, "Set a positive timestep first")
+            return {'CANCELLED'}
+        # Kept on the scene so the panel shows it without recomputing on every redraw
+        scene["liggghts_cost"] = {key: float(value) for key, value in scene_cost_estimate(scene).items()}
+        return {'FINISHED'}
+
 # Register the addon components
 def register():
     register_properties()
@@ -138,7 +421,12 @@ def register():
     bpy.utils.register_class(LIGGGHTS_OT_SetTray)
     bpy.utils.register_class(LIGGGHTS_OT_SetInsertionVolume)
     bpy.utils.register_class(LIGGGHTS_OT_SetSimulationVolume)
+    bpy.utils.register_class(LIGGGHTS_OT_UpdateTriangleCounts)
+    bpy.utils.register_class(LIGGGHTS_OT_ComputeTimestep)
+    bpy.utils.register_class(LIGGGHTS_OT_EstimateCost)
     bpy.utils.register_class(LIGGGHTS_OT_GenerateInput)
+    import_dump.register()
+    import_forces.register()
 
 
 def unregister():
@@ -149,7 +437,12 @@ def unregister():
     bpy.utils.unregister_class(LIGGGHTS_OT_SetTray)
     bpy.utils.unregister_class(LIGGGHTS_OT_SetInsertionVolume)
     bpy.utils.unregister_class(LIGGGHTS_OT_SetSimulationVolume)
+    bpy.utils.unregister_class(LIGGGHTS_OT_UpdateTriangleCounts)
+    bpy.utils.unregister_class(LIGGGHTS_OT_ComputeTimestep)
+    bpy.utils.unregister_class(LIGGGHTS_OT_EstimateCost)
     bpy.utils.unregister_class(LIGGGHTS_OT_GenerateInput)
+    import_dump.unregister()
+    import_forces.unregister()
 
 if __name__ == "__main__":
     register()
\ No newline at end of file
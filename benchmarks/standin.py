@@ -0,0 +1,237 @@
+"""Lightweight bpy and mathutils stand-ins for benchmarking the exporter in plain CPython.
+
+Only the parts of the API the exporter touches are provided: enough to
+import the addon, evaluate synthetic meshes frame by frame and run the
+rigid motion maths. install() puts them in sys.modules; it must run
+before the addon is imported.
+"""
+import sys
+import math
+import types
+
+import numpy as np
+
+class Vector:
+    """A 3D vector backed by numpy."""
+
+    def __init__(self, values=(0.0, 0.0, 0.0)):
+        self.values = np.array(values, dtype=np.float64)
+
+    x = property(lambda self: self.values[0])
+    y = property(lambda self: self.values[1])
+    z = property(lambda self: self.values[2])
+
+    def copy(self):
+        return Vector(self.values)
+
+    def __sub__(self, other):
+        return Vector(self.values - np.asarray(other, dtype=np.float64))
+
+    def __add__(self, other):
+        return Vector(self.values + np.asarray(other, dtype=np.float64))
+
+    def __mul__(self, scalar):
+        return Vector(self.values * scalar)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __array__(self, dtype=None, copy=None):
+        return self.values if dtype is None else self.values.astype(dtype)
+
+    @property
+    def length(self):
+        return float(np.linalg.norm(self.values))
+
+class Quaternion:
+    """A (w, x, y, z) rotation quaternion backed by numpy."""
+
+    def __init__(self, values=(1.0, 0.0, 0.0, 0.0)):
+        self.values = np.array(values, dtype=np.float64)
+
+    def copy(self):
+        return Quaternion(self.values)
+
+    def dot(self, other):
+        return float(self.values @ other.values)
+
+    def negate(self):
+        self.values = -self.values
+
+    def inverted(self):
+        w, x, y, z = self.values
+        return Quaternion((w, -x, -y, -z))
+
+    def __matmul__(self, other):
+        w1, x1, y1, z1 = self.values
+        w2, x2, y2, z2 = other.values
+        return Quaternion((
+            w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+            w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+            w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+            w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
+        ))
+
+    def to_axis_angle(self):
+        q = self.values / np.linalg.norm(self.values)
+        w = min(1.0, max(-1.0, q[0]))
+        angle = 2 * math.acos(w)
+        sine = math.sqrt(max(0.0, 1 - w * w))
+        if sine < 1e-12:
+            return Vector((1.0, 0.0, 0.0)), 0.0
+        axis = q[1:] / sine
+        if angle > math.pi:
+            angle, axis = 2 * math.pi - angle, -axis
+        return Vector(axis), angle
+
+class Matrix:
+    """A 4x4 transform matrix backed by numpy."""
+
+    def __init__(self, rows=None):
+        self.values = np.eye(4) if rows is None else np.array(rows, dtype=np.float64)
+
+    @property
+    def translation(self):
+        return Vector(self.values[:3, 3])
+
+    def __matmul__(self, other):
+        if isinstance(other, Vector):
+            return Vector(self.values[:3, :3] @ other.values + self.values[:3, 3])
+        return Matrix(self.values @ np.asarray(other))
+
+    def __array__(self, dtype=None, copy=None):
+        return self.values if dtype is None else self.values.astype(dtype)
+
+    def to_quaternion(self):
+        m = self.values[:3, :3] / np.linalg.norm(self.values[:3, :3], axis=0)
+        trace = np.trace(m)
+        if trace > 0:
+            s = math.sqrt(trace + 1) * 2
+            return Quaternion((0.25 * s, (m[2, 1] - m[1, 2]) / s, (m[0, 2] - m[2, 0]) / s, (m[1, 0] - m[0, 1]) / s))
+        axis = int(np.argmax(np.diag(m)))
+        if axis == 0:
+            s = math.sqrt(1 + m[0, 0] - m[1, 1] - m[2, 2]) * 2
+            return Quaternion(((m[2, 1] - m[1, 2]) / s, 0.25 * s, (m[0, 1] + m[1, 0]) / s, (m[0, 2] + m[2, 0]) / s))
+        if axis == 1:
+            s = math.sqrt(1 + m[1, 1] - m[0, 0] - m[2, 2]) * 2
+            return Quaternion(((m[0, 2] - m[2, 0]) / s, (m[0, 1] + m[1, 0]) / s, 0.25 * s, (m[1, 2] + m[2, 1]) / s))
+        s = math.sqrt(1 + m[2, 2] - m[0, 0] - m[1, 1]) * 2
+        return Quaternion(((m[1, 0] - m[0, 1]) / s, (m[0, 2] + m[2, 0]) / s, (m[1, 2] + m[2, 1]) / s, 0.25 * s))
+
+class _Collection:
+    """A mesh element collection supporting foreach_get."""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+
+    def __len__(self):
+        return len(next(iter(self.arrays.values())))
+
+    def foreach_get(self, attribute, buffer):
+        buffer[:] = self.arrays[attribute].ravel()
+
+class SyntheticMesh:
+    """An evaluated mesh snapshot with vertices, loop triangles and normals."""
+
+    def __init__(self, vertices, triangles):
+        corners = vertices[triangles]
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-30)
+        self.vertices = _Collection({"co": vertices.astype(np.float32)})
+        self.loop_triangles = _Collection({"vertices": triangles.astype(np.int32), "normal": normals.astype(np.float32)})
+
+    def calc_loop_triangles(self):
+        pass
+
+class SyntheticObject:
+    """A mesh object whose world matrix and vertices are functions of the scene frame."""
+
+    def __init__(self, scene, name, vertices, triangles, matrix_at=None, vertices_at=None):
+        self.scene = scene
+        self.name = name
+        self.vertices = vertices
+        self.triangles = triangles
+        self.matrix_at = matrix_at or (lambda frame: np.eye(4))
+        self.vertices_at = vertices_at or (lambda frame: vertices)
+        self.modifiers = []
+        self.constraints = []
+        self.rigid_body = None
+        self.parent = None
+        self.animation_data = None
+        low, high = vertices.min(axis=0), vertices.max(axis=0)
+        self.bound_box = [(x, y, z) for x in (low[0], high[0]) for y in (low[1], high[1]) for z in (low[2], high[2])]
+
+    @property
+    def matrix_world(self):
+        return Matrix(self.matrix_at(self.scene.frame_current))
+
+    def evaluated_get(self, depsgraph):
+        return self
+
+    def to_mesh(self):
+        return SyntheticMesh(self.vertices_at(self.scene.frame_current), self.triangles)
+
+    def to_mesh_clear(self):
+        pass
+
+class SyntheticScene:
+    """A scene with a frame range and a current frame."""
+
+    def __init__(self, frame_start=1, frame_end=250):
+        self.frame_start = frame_start
+        self.frame_end = frame_end
+        self.frame_current = frame_start
+        self.objects = []
+
+    def frame_set(self, frame):
+        self.frame_current = frame
+
+class _Types:
+    """bpy.types stand-in handing out an empty base class per type name."""
+
+    def __init__(self):
+        self._classes = {}
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self._classes.setdefault(name, type(name, (), {}))
+
+def _property(*args, **kwargs):
+    return None
+
+def install(scene=None):
+    """Install the stand-ins as the bpy and mathutils modules and return the scene they evaluate.
+
+    Without a scene, stand-ins that are already installed are kept, so
+    addon modules imported against them still see the returned scene.
+    """
+    installed = sys.modules.get("bpy")
+    if scene is None and isinstance(getattr(installed, "types", None), _Types):
+        return installed.context.scene
+    scene = scene or SyntheticScene()
+
+    mathutils = types.ModuleType("mathutils")
+    mathutils.Vector, mathutils.Matrix, mathutils.Quaternion = Vector, Matrix, Quaternion
+
+    bpy = types.ModuleType("bpy")
+    bpy.types = _Types()
+    bpy.props = types.SimpleNamespace(**{name: _property for name in (
+        "BoolProperty", "CollectionProperty", "EnumProperty", "FloatProperty",
+        "IntProperty", "PointerProperty", "StringProperty")})
+    bpy.utils = types.SimpleNamespace(register_class=_property, unregister_class=_property)
+    bpy.context = types.SimpleNamespace(scene=scene, evaluated_depsgraph_get=lambda: None)
+    bpy.data = types.SimpleNamespace(filepath="", is_dirty=False, objects={})
+    bpy.app = types.SimpleNamespace(binary_path=sys.executable, background=True,
+                                    handlers=types.SimpleNamespace(persistent=lambda function: function, frame_change_post=[]))
+    bpy.path = types.SimpleNamespace(abspath=lambda path: path)
+
+    sys.modules["mathutils"] = mathutils
+    sys.modules["bpy"] = bpy
+    return scene
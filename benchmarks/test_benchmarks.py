@@ -0,0 +1,38 @@
+"""Smoke test of the benchmark suite against the bpy/mathutils stand-ins.
+
+Run with: python -m pytest benchmarks
+"""
+import os
+import sys
+import json
+import importlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import standin
+import run_benchmarks
+
+# The repository root is a package, so pytest imports the addon's __init__.py, which needs bpy, before the test runs
+standin.install()
+
+def test_benchmarks_run_on_standin(tmp_path):
+    results_path = tmp_path / "results.json"
+    run_benchmarks.main(["--objects", "1", "--frames", "5", "--triangles", "20", "--repeat", "1", "--standin",
+                         "--json", str(results_path)])
+    with open(results_path) as file:
+        saved = json.load(file)
+    assert saved["mode"] == "standin"
+    assert [result["name"] for result in saved["results"]] == [
+        "export_rigid_stls", "export_deformable_stls", "write_run_file[SEGMENTS]", "write_run_file[TABULATED]",
+        "write_setup_file", "frame_motion[loop]", "frame_motion[vectorized]"]
+    assert all(result["lines"] > 0 for result in saved["results"] if result["name"].startswith("write_"))
+
+    # The stand-ins and the addon are imported by main; the vectorized motion must match the loop it replaced
+    motion = importlib.import_module(f"{os.path.basename(run_benchmarks.ADDON_ROOT)}.utils.motion")
+    world_matrices = run_benchmarks.synthetic_world_matrices(2, 20)
+    expected = run_benchmarks.loop_frame_motion(world_matrices, 250.0)
+    for actual, baseline in zip(motion.frame_motion(world_matrices, 250.0), expected):
+        np.testing.assert_allclose(actual, baseline, atol=1e-9)
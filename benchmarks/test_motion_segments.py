@@ -0,0 +1,91 @@
+"""Replay the run script's move/mesh segments for a turning wheel against its sampled transforms.
+
+Run with: python -m pytest benchmarks
+"""
+import os
+import sys
+import types
+import importlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import standin
+import run_benchmarks
+
+# The repository root is a package, so pytest imports the addon's __init__.py, which needs bpy, before the test runs
+standin.install()
+
+FRAME_RATE = 24.0
+SPEED = 0.5  # m/s along x
+RADIUS = 0.1  # m, rolling about y on the plane z = 0
+
+def wheel_world_matrices(frame_count, speed):
+    """Return (frames, 1, 4, 4) transforms of a wheel turning at SPEED / RADIUS while its centre moves at speed along x."""
+    times = np.arange(frame_count) / FRAME_RATE
+    angles = SPEED * times / RADIUS
+    matrices = np.tile(np.eye(4), (frame_count, 1, 1, 1))
+    matrices[:, 0, 0, 0] = np.cos(angles)
+    matrices[:, 0, 0, 2] = np.sin(angles)
+    matrices[:, 0, 2, 0] = -np.sin(angles)
+    matrices[:, 0, 2, 2] = np.cos(angles)
+    matrices[:, 0, 0, 3] = speed * times
+    matrices[:, 0, 2, 3] = RADIUS
+    return matrices
+
+def replay(commands, points, timestep, substep_timesteps=100):
+    """Move points through the velocity field of the active move/mesh fixes, run by run.
+
+    A rotate fix turns about its origin held fixed in space and a linear fix
+    translates, so together they give v = V + w x (p - origin).
+    """
+    fixes = {}
+    for command in commands:
+        words = str(command).split()
+        if words[0] == "fix":
+            args = words[6:]  # after "fix <id> all move/mesh mesh <name>"
+            if args[0] == "rotate":
+                origin = np.array(args[2:5], dtype=float)
+                axis = np.array(args[6:9], dtype=float)
+                fixes[words[1]] = ("rotate", origin, axis * 2 * np.pi / float(args[10]))
+            else:
+                fixes[words[1]] = ("linear", np.array(args[1:4], dtype=float))
+        elif words[0] == "unfix":
+            del fixes[words[1]]
+        elif words[0] == "run":
+            def velocity(p):
+                v = np.zeros_like(p)
+                for fix in fixes.values():
+                    v += fix[1] if fix[0] == "linear" else np.cross(fix[2], p - fix[1])
+                return v
+            substeps = max(1, int(words[1]) // substep_timesteps)
+            dt = int(words[1]) * timestep / substeps
+            for _ in range(substeps):
+                # Fourth-order Runge-Kutta, exact enough for the affine field of a segment
+                k1 = velocity(points)
+                k2 = velocity(points + dt / 2 * k1)
+                k3 = velocity(points + dt / 2 * k2)
+                k4 = velocity(points + dt * k3)
+                points = points + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+    return points
+
+# Rolling: the centre translates while the wheel turns, so no single fixed-pivot velocity field fits two steps.
+# Spinning in place: one segment covers the whole take once any tolerance absorbs the float noise.
+@pytest.mark.parametrize("speed, tolerance, runs", [(SPEED, 0.0, 47), (SPEED, 1e-3, 47), (0.0, 1e-3, 1)])
+def test_segments_replay_turning_wheel(speed, tolerance, runs):
+    package = os.path.basename(run_benchmarks.ADDON_ROOT)
+    file_writer = importlib.import_module(f"{package}.utils.file_writer")
+    world_matrices = wheel_world_matrices(48, speed)
+    params = run_benchmarks.simulation_params("SEGMENTS", FRAME_RATE)
+    params.update(linear_tolerance=tolerance, angular_tolerance=tolerance, linear_epsilon=0.0, angular_epsilon=0.0)
+    commands = list(file_writer.motion_segment_commands(params, [types.SimpleNamespace(name="wheel")], world_matrices, 1))
+    assert sum(str(command).startswith("run ") for command in commands) == runs
+
+    # The centre and a point on the rim, in the wheel's local coordinates
+    local = np.array([[0.0, 0.0, 0.0, 1.0], [0.0, 0.0, RADIUS, 1.0]])
+    start = (world_matrices[0, 0] @ local.T).T[:, :3]
+    expected = (world_matrices[-1, 0] @ local.T).T[:, :3]
+    timestep = 1 / (FRAME_RATE * params["timesteps_per_frame"])
+    np.testing.assert_allclose(replay(commands, start, timestep), expected, atol=1e-5)
@@ -0,0 +1,166 @@
+import os
+import bpy
+from ..utils.dump_reader import DumpSeries, find_dump_files, read_script_settings
+from ..utils.file_writer import warmup_steps
+
+NODE_GROUP_NAME = "LIGGGHTS Particles"
+_series = {}  # (post directory, cache size) -> (stamp, DumpSeries) shared by the objects showing it
+
+def series_stamp(post_dir, series=None):
+    """Return a stamp that changes when a post directory's dumps are rewritten.
+
+    A re-run adds or rewrites files, which changes either the directory's
+    modification time or that of its first dump.
+    """
+    stamp = str(os.stat(post_dir).st_mtime_ns)
+    if series is not None and len(series) and os.path.exists(series.frames[0].filepath):
+        stamp += f":{os.stat(series.frames[0].filepath).st_mtime_ns}"
+    return stamp
+
+def dump_series(post_dir, columns=None, cache_size=4):
+    """Return the stamp and indexed dump series of a post directory, indexing it again when its dumps change."""
+    key = (post_dir, cache_size)
+    if key in _series:
+        stamp, series = _series[key]
+        if series_stamp(post_dir, series) == stamp:
+            return stamp, series
+    series = DumpSeries(post_dir, columns, cache_size)
+    _series[key] = (series_stamp(post_dir, series), series)
+    return _series[key]
+
+def forget_series(post_dir):
+    """Drop the cached series of a post directory, so its dumps are indexed afresh."""
+    for key in [key for key in _series if key[0] == post_dir]:
+        del _series[key]
+
+def run_frame_steps(settings, frame_rate, timestep):
+    """Return the warm-up steps and steps per frame of a run from its script settings.
+
+    Frame k of the animation starts at timestep warmup + k * steps per
+    frame, counted from the reset_timestep after read_restart. Scripts that
+    do not record them fall back to the values the addon would choose.
+    """
+    variables = settings["variables"]
+    steps_per_frame = int(float(variables.get("frame_steps", max(1, round(1 / frame_rate / timestep)))))
+    warmup = int(float(variables.get("warmup_steps", warmup_steps(steps_per_frame))))
+    return warmup, steps_per_frame
+
+def particle_node_group():
+    """Return the geometry node group that turns the imported vertices into points of their dumped radius."""
+    group = bpy.data.node_groups.get(NODE_GROUP_NAME)
+    if group is not None:
+        return group
+    group = bpy.data.node_groups.new(NODE_GROUP_NAME, 'GeometryNodeTree')
+    group.interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    group.interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+    nodes = group.nodes
+    group_input = nodes.new('NodeGroupInput')
+    group_output = nodes.new('NodeGroupOutput')
+    to_points = nodes.new('GeometryNodeMeshToPoints')
+    radius = nodes.new('GeometryNodeInputNamedAttribute')
+    radius.data_type = 'FLOAT'
+    radius.inputs["Name"].default_value = "radius"
+    group.links.new(group_input.outputs[0], to_points.inputs["Mesh"])
+    group.links.new(radius.outputs["Attribute"], to_points.inputs["Radius"])
+    group.links.new(to_points.outputs["Points"], group_output.inputs[0])
+    return group
+
+def frame_timestep(obj, frame):
+    """Return the simulation timestep that a Blender frame shows on an imported particle object."""
+    return obj["liggghts_warmup_steps"] + (frame - obj["liggghts_frame_start"]) * obj["liggghts_steps_per_frame"]
+
+def show_snapshot(obj, series, index):
+    """Replace the vertices of a particle object's mesh with one snapshot's positions and radii."""
+    positions, radii = series.particles(index)
+    mesh = obj.data
+    mesh.clear_geometry()
+    mesh.vertices.add(len(positions))
+    mesh.vertices.foreach_set("co", positions.astype("f4").ravel())
+    if radii is not None:
+        attribute = mesh.attributes.get("radius") or mesh.attributes.new("radius", 'FLOAT', 'POINT')
+        attribute.data.foreach_set("value", radii.astype("f4"))
+    mesh.update()
+    obj["liggghts_snapshot"] = index
+
+def update_particle_object(obj, frame):
+    """Show the snapshot of frame on an imported particle object, if it is not already shown."""
+    columns = obj["liggghts_dump_columns"].split() if obj.get("liggghts_dump_columns") else None
+    stamp, series = dump_series(obj["liggghts_dump_dir"], columns, obj["liggghts_cache_size"])
+    index = series.index_at(frame_timestep(obj, frame))
+    shown = f"{stamp}/{index}"
+    if obj.get("liggghts_shown") != shown:
+        show_snapshot(obj, series, index)
+        obj["liggghts_shown"] = shown
+
+@bpy.app.handlers.persistent
+def update_particle_objects(scene, depsgraph=None):
+    """Load the dumped particles of the new frame into every imported particle object."""
+    for obj in scene.objects:
+        if "liggghts_dump_dir" in obj and os.path.isdir(obj["liggghts_dump_dir"]):
+            update_particle_object(obj, scene.frame_current)
+
+class LIGGGHTS_OT_ImportDump(bpy.types.Operator):
+    """Import the particle dumps of a LIGGGHTS run as a point object that follows the timeline"""
+    bl_idname = "liggghts.import_dump"
+    bl_label = "Import Particle Dumps"
+
+    filepath: bpy.props.StringProperty(subtype='DIR_PATH')
+    cache_size: bpy.props.IntProperty(
+        name="Cached Frames",
+        default=4,
+        min=1,
+        description="Decoded snapshots kept in memory"
+    )
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        scene = context.scene
+        case_dir = bpy.path.abspath(self.filepath)
+        post_dir = os.path.join(case_dir, "post") if os.path.isdir(os.path.join(case_dir, "post")) else case_dir
+        if not os.path.isdir(post_dir) or not find_dump_files(post_dir):
+            self.report({'ERROR'}, f"No particle dumps found in {post_dir}")
+            return {'CANCELLED'}
+
+        # The run script records the timestep and the columns, which binary dumps do not
+        script_path = os.path.join(os.path.dirname(os.path.normpath(post_dir)), "run.liggghts")
+        settings = read_script_settings(script_path) if os.path.exists(script_path) else {"variables": {}, "columns": None, "meshes": None}
+        timestep = float(settings["variables"].get("s", scene.liggghts_timestep))
+        forget_series(post_dir)
+        try:
+            _, series = dump_series(post_dir, settings["columns"], self.cache_size)
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        if not len(series) or not {"x", "y", "z"} <= set(series.frames[0].columns):
+            self.report({'ERROR'}, f"The dumps in {post_dir} have no particle positions")
+            return {'CANCELLED'}
+
+        mesh = bpy.data.meshes.new("LIGGGHTS Particles")
+        obj = bpy.data.objects.new(mesh.name, mesh)
+        scene.collection.objects.link(obj)
+        obj.modifiers.new("Particles", 'NODES').node_group = particle_node_group()
+        obj["liggghts_dump_dir"] = post_dir
+        if settings["columns"]:
+            obj["liggghts_dump_columns"] = " ".join(settings["columns"])
+        obj["liggghts_cache_size"] = self.cache_size
+        obj["liggghts_warmup_steps"], obj["liggghts_steps_per_frame"] = run_frame_steps(settings, scene.liggghts_framerate, timestep)
+        obj["liggghts_frame_start"] = scene.frame_start
+        update_particle_object(obj, scene.frame_current)
+
+        self.report({'INFO'}, f"Indexed {len(series)} snapshots in {post_dir}; frames load as the timeline moves")
+        return {'FINISHED'}
+
+# Register the operator and the frame change handler
+def register():
+    bpy.utils.register_class(LIGGGHTS_OT_ImportDump)
+    if update_particle_objects not in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.append(update_particle_objects)
+
+def unregister():
+    if update_particle_objects in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(update_particle_objects)
+    bpy.utils.unregister_class(LIGGGHTS_OT_ImportDump)
+    _series.clear()
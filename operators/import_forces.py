@@ -0,0 +1,109 @@
+import os
+import bpy
+import numpy as np
+from ..utils.contact_forces import force_series, index_force_dumps, iter_contact_forces, write_force_series
+from ..utils.dump_reader import read_script_settings
+from ..utils.steps import drain
+from .import_dump import run_frame_steps
+
+FCURVE_GROUP = "LIGGGHTS Contact Forces"
+
+def fill_gaps(values):
+    """Replace NaN rows of a (snapshots, components) series with the last valid row, or zero before the first."""
+    valid = ~np.isnan(values).any(axis=1)
+    last = np.maximum.accumulate(np.where(valid, np.arange(len(values)), -1))
+    return np.where((last >= 0)[:, None], values[np.maximum(last, 0)], 0.0)
+
+def key_series(obj, prop, frames, values):
+    """Set a custom property of obj to a (snapshots, components) series and key it at every frame.
+
+    The keyframes of each component are written in one foreach_set call,
+    replacing any left by an earlier import.
+    """
+    values = np.asarray(values, dtype=np.float64).reshape(len(frames), -1)
+    obj[prop] = [float(value) for value in values[0]] if values.shape[1] > 1 else float(values[0, 0])
+    animation = obj.animation_data or obj.animation_data_create()
+    if animation.action is None:
+        animation.action = bpy.data.actions.new(f"{obj.name}Action")
+    for index in range(values.shape[1]):
+        fcurve = animation.action.fcurve_ensure_for_datablock(obj, f'["{prop}"]', index=index, group_name=FCURVE_GROUP)
+        fcurve.keyframe_points.clear()
+        fcurve.keyframe_points.add(len(frames))
+        fcurve.keyframe_points.foreach_set("co", np.column_stack((frames, values[:, index])).astype("f4").ravel())
+        fcurve.update()
+
+class LIGGGHTS_OT_ImportContactForces(bpy.types.Operator):
+    """Aggregate the contact force dumps of a rigid LIGGGHTS run and key them on the moving objects"""
+    bl_idname = "liggghts.import_contact_forces"
+    bl_label = "Import Contact Forces"
+
+    filepath: bpy.props.StringProperty(subtype='DIR_PATH')
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        scene = context.scene
+        case_dir = os.path.normpath(bpy.path.abspath(self.filepath))
+        if os.path.basename(case_dir) == "post":
+            case_dir = os.path.dirname(case_dir)
+        post_dir = os.path.join(case_dir, "post")
+        script_path = os.path.join(case_dir, "run.liggghts")
+        if not os.path.exists(script_path):
+            self.report({'ERROR'}, f"No run.liggghts in {case_dir}")
+            return {'CANCELLED'}
+
+        # The run script names the meshes in the order the compute numbers them
+        settings = read_script_settings(script_path)
+        mesh_names = settings["meshes"]
+        if not mesh_names:
+            self.report({'ERROR'}, f"{script_path} has no wall mesh fix")
+            return {'CANCELLED'}
+        timestep = float(settings["variables"].get("s", scene.liggghts_timestep))
+        try:
+            frames = index_force_dumps(post_dir) if os.path.isdir(post_dir) else []
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        if not frames:
+            self.report({'ERROR'}, f"No contact force dumps found in {post_dir}; they are written by rigid runs only")
+            return {'CANCELLED'}
+
+        window_manager = context.window_manager
+        window_manager.progress_begin(0, len(frames))
+        try:
+            timesteps, sums = drain(iter_contact_forces(frames, len(mesh_names)), window_manager.progress_update)
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        finally:
+            window_manager.progress_end()
+        series = force_series(timesteps, sums, timestep)
+        write_force_series(case_dir, series, mesh_names)
+
+        # Snapshots map to frames the same way the imported particle dumps do; the dump
+        # cadence is whole frames counted from the reset timestep, so each lands on a frame
+        warmup, steps_per_frame = run_frame_steps(settings, scene.liggghts_framerate, timestep)
+        key_frames = scene.frame_start + (np.asarray(timesteps, dtype=np.int64) - warmup) // steps_per_frame
+        keyed = []
+        for item in scene.liggghts_moving_objects:
+            obj = bpy.data.objects.get(item.name)
+            if obj is None or item.name not in mesh_names:
+                continue
+            mesh = mesh_names.index(item.name)
+            key_series(obj, "liggghts_force", key_frames, series["force"][:, mesh])
+            key_series(obj, "liggghts_centre_of_pressure", key_frames, fill_gaps(series["centre_of_pressure"][:, mesh]))
+            key_series(obj, "liggghts_impulse", key_frames, series["impulse"][:, mesh])
+            key_series(obj, "liggghts_contacts", key_frames, series["contacts"][:, mesh])
+            keyed.append(obj.name)
+
+        self.report({'INFO'}, f"Aggregated {len(frames)} contact force snapshots into {case_dir}/contact_forces.csv; keyed {len(keyed)} objects")
+        return {'FINISHED'}
+
+# Register the operator
+def register():
+    bpy.utils.register_class(LIGGGHTS_OT_ImportContactForces)
+
+def unregister():
+    bpy.utils.unregister_class(LIGGGHTS_OT_ImportContactForces)
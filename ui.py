@@ -36,22 +36,110 @@ class LIGGGHTS_PT_MainPanel(bpy.types.Panel):
         row = layout.row()
         row.prop(scene, "liggghts_simulation_volume", text="")
         row.operator("liggghts.set_simulation_volume", text="Set Simulation Volume")
+        row = layout.row()
+        row.prop(scene, "liggghts_tight_domain", text="Tight Domain")
+        sub = row.row()
+        sub.enabled = scene.liggghts_tight_domain
+        sub.prop(scene, "liggghts_domain_padding", text="Padding / Radius")
 
         # Parameters
         layout.label(text="Parameters:")
         layout.prop(scene, "liggghts_radius", text="Radius")
         layout.prop(scene, "liggghts_timestep_str", text="Timestep")
+        row = layout.row()
+        row.prop(scene, "liggghts_auto_timestep", text="Auto Timestep")
+        row.prop(scene, "liggghts_timestep_safety", text="Safety Factor")
+        layout.operator("liggghts.compute_timestep", text="Compute Stable Timestep")
         layout.prop(scene, "liggghts_youngs_modulus", text="Young's Modulus")
         layout.prop(scene, "liggghts_cohesion", text="Cohesion")
         layout.prop(scene, "liggghts_poisson_ratio", text="Poisson Ratio")
+        layout.prop(scene, "liggghts_density", text="Density")
         layout.prop(scene, "liggghts_framerate", text="Framerate")
+        layout.prop(scene, "liggghts_mpi_ranks", text="MPI Ranks")
+        layout.prop(scene, "liggghts_stl_ascii", text="ASCII STL")
+        layout.prop(scene, "liggghts_export_workers", text="Deformable Export Workers")
+        layout.prop(scene, "liggghts_deformable_tolerance", text="Deformable Frame Tolerance")
+
+        # Decimation
+        layout.label(text="Mesh Decimation:")
+        layout.prop(scene, "liggghts_decimate", text="Decimate Meshes")
+        row = layout.row()
+        row.enabled = scene.liggghts_decimate
+        row.prop(scene, "liggghts_decimate_edge_factor", text="Edge Length / Radius")
+        layout.operator("liggghts.update_triangle_counts", text="Update Triangle Counts")
+        box = layout.box()
+        if scene.liggghts_tray:
+            box.label(text=f"{scene.liggghts_tray.name}: {scene.liggghts_tray_triangles} -> {scene.liggghts_tray_triangles_decimated} triangles")
+        for item in scene.liggghts_moving_objects:
+            box.label(text=f"{item.name}: {item.triangles} -> {item.triangles_decimated} triangles")
+
+        # Settling
+        layout.label(text="Settling:")
+        layout.prop(scene, "liggghts_settle_max_steps", text="Max Steps")
+        layout.prop(scene, "liggghts_settle_early", text="Stop at Rest")
+        col = layout.column()
+        col.enabled = scene.liggghts_settle_early
+        col.prop(scene, "liggghts_settle_speed", text="Rest Speed")
+        col.prop(scene, "liggghts_settle_block", text="Check Every (steps)")
+        layout.prop(scene, "liggghts_restart_cache_dir", text="Restart Cache")
+
+        # Motion
+        layout.label(text="Rigid Motion:")
+        layout.prop(scene, "liggghts_motion_mode", text="Mode")
+        if scene.liggghts_motion_mode == 'SEGMENTS':
+            layout.prop(scene, "liggghts_linear_tolerance", text="Linear Tolerance")
+            layout.prop(scene, "liggghts_angular_tolerance", text="Angular Tolerance")
+        row = layout.row()
+        row.prop(scene, "liggghts_linear_epsilon", text="Linear Noise")
+        row.prop(scene, "liggghts_angular_epsilon", text="Angular Noise")
+
+        # Dump Output
+        layout.label(text="Dump Output:")
+        row = layout.row()
+        row.prop(scene, "liggghts_dump_every_frames", text="Every (frames)")
+        row.prop(scene, "liggghts_dump_format", text="")
+        layout.prop(scene, "liggghts_dump_fields", expand=True)
+        row = layout.row()
+        row.prop(scene, "liggghts_dump_near_objects", text="Near Moving Objects")
+        sub = row.row()
+        sub.enabled = scene.liggghts_dump_near_objects
+        sub.prop(scene, "liggghts_dump_region_padding", text="Padding (radii)")
+        row = layout.row()
+        row.prop(scene, "liggghts_force_dump", text="Contact Forces (rigid)")
+        sub = row.row()
+        sub.enabled = scene.liggghts_force_dump
+        sub.prop(scene, "liggghts_force_dump_every_frames", text="Every (frames)")
+
+        # Cost Estimate
+        layout.label(text="Cost Estimate:")
+        row = layout.row()
+        row.prop(scene, "liggghts_max_core_hours", text="Max Core-Hours")
+        row.operator("liggghts.estimate_cost", text="Estimate")
+        cost = scene.get("liggghts_cost")
+        if cost is not None:
+            box = layout.box()
+            box.label(text=f"Particles: ~{cost['particles']:.0f}")
+            box.label(text=f"Neighbour bins: {cost['bins']:.0f}")
+            box.label(text=f"Memory per rank: ~{cost['memory_per_rank'] / 2 ** 20:.0f} MiB")
+            box.label(text=f"Steps: {cost['steps']:.0f}")
+            box.label(text=f"Runtime: ~{cost['wall_hours']:.1f} h on {cost['ranks']:.0f} ranks ({cost['core_hours']:.1f} core-hours)")
+            forces = f" and {cost['force_dumps']:.0f} force dumps" if cost.get("force_dumps") else ""
+            box.label(text=f"Dump output: ~{cost['dump_bytes'] / 2 ** 30:.2f} GiB over {cost['dumps']:.0f} dumps{forces}")
+            if 0 < scene.liggghts_max_core_hours < cost['core_hours']:
+                box.label(text="Exceeds the core-hour limit", icon='ERROR')
 
         # Generate Buttons
         layout.label(text="Generate LIGGGHTS Input Files:")
+        layout.prop(scene, "liggghts_cprofile", text="Write cProfile Stats")
         row = layout.row()
         row.operator("liggghts.generate_input", text="Deformable Mesh").deformable = True
         row.operator("liggghts.generate_input", text="Rigid Mesh").deformable = False
 
+        # Results
+        layout.label(text="Simulation Results:")
+        layout.operator("liggghts.import_dump", text="Import Particle Dumps")
+        layout.operator("liggghts.import_contact_forces", text="Import Contact Forces")
+
 # Register the panel
 def register():
     bpy.utils.register_class(LIGGGHTS_PT_MainPanel)
@@ -0,0 +1,122 @@
+from collections import namedtuple
+from .profiling import count
+
+class Command(namedtuple("Command", "name args")):
+    """A generic LIGGGHTS command such as 'units si' or 'timestep $s'."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.name} {self.args}" if self.args else self.name
+
+class Comment(namedtuple("Comment", "text")):
+    """A comment line."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"# {self.text}"
+
+class Section(namedtuple("Section", "title")):
+    """A section header comment."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"#----------{self.title}----------#"
+
+class Blank(namedtuple("Blank", "")):
+    """An empty separator line."""
+    __slots__ = ()
+
+    def __str__(self):
+        return ""
+
+class Variable(namedtuple("Variable", "name style args")):
+    """A 'variable' command."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"variable {self.name} {self.style} {self.args}"
+
+class Fix(namedtuple("Fix", "fix_id group style args")):
+    """A 'fix' command."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"fix {self.fix_id} {self.group} {self.style} {self.args}" if self.args else f"fix {self.fix_id} {self.group} {self.style}"
+
+class Unfix(namedtuple("Unfix", "fix_id")):
+    """An 'unfix' command."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"unfix {self.fix_id}"
+
+class Run(namedtuple("Run", "steps")):
+    """A 'run' command."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"run {self.steps}"
+
+class Region(namedtuple("Region", "region_id style args")):
+    """A 'region' command."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"region {self.region_id} {self.style} {self.args}"
+
+class Dump(namedtuple("Dump", "dump_id group style every filename args")):
+    """A 'dump' command."""
+    __slots__ = ()
+
+    def __str__(self):
+        line = f"dump {self.dump_id} {self.group} {self.style} {self.every} {self.filename}"
+        return f"{line} {self.args}" if self.args else line
+
+class Undump(namedtuple("Undump", "dump_id")):
+    """An 'undump' command."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"undump {self.dump_id}"
+
+def merge_runs(commands):
+    """Merge consecutive Run commands into one, passing everything else through."""
+    pending = 0
+    for command in commands:
+        if isinstance(command, Run):
+            pending += command.steps
+            continue
+        if pending:
+            yield Run(pending)
+            pending = 0
+        yield command
+    if pending:
+        yield Run(pending)
+
+def iter_write_commands(filepath, commands, chunk_lines=4096):
+    """Serialize a command stream to filepath, writing it in buffered chunks.
+
+    Yields (lines written, None) after each chunk, the total not being known
+    until the stream ends, and returns the number of lines written.
+    """
+    line_count = 0
+    fix_count = 0
+    chunk = []
+    with open(filepath, "w") as file:
+        for command in commands:
+            chunk.append(str(command))
+            if isinstance(command, Fix):
+                fix_count += 1
+            if len(chunk) >= chunk_lines:
+                file.write("\n".join(chunk))
+                file.write("\n")
+                line_count += len(chunk)
+                chunk.clear()
+                yield line_count, None
+        if chunk:
+            file.write("\n".join(chunk))
+            file.write("\n")
+            line_count += len(chunk)
+    count("script lines", line_count)
+    count("fixes emitted", fix_count)
+    return line_count
@@ -0,0 +1,115 @@
+"""Streaming aggregation of the wall contact forces dumped by rigid runs.
+
+The run script dumps compute wall/gran/local as local dumps holding one row
+per particle-mesh contact, which quickly outgrows memory on long runs. The
+snapshots are read block by block and reduced per mesh with bincount, so
+only one block and the per-mesh sums are held at a time.
+"""
+import os
+import re
+
+import numpy as np
+
+from .dump_reader import index_text_dump, iter_frame_blocks
+
+FORCE_PATTERN = re.compile(r"^force.*\.txt(\.gz)?$")  # contact force dumps written by the run script
+# Columns of compute wall/gran/local with "id pos force", in the order LIGGGHTS
+# writes them: the particle and contact point positions, the mesh's index in
+# the wall fix, the triangle and particle ids, then the force on the particle.
+FORCE_COLUMNS = ("x", "y", "z", "cx", "cy", "cz", "mesh", "triangle", "particle", "fx", "fy", "fz")
+CONTACT = slice(3, 6)
+MESH = 6
+FORCE = slice(9, 12)
+# Per-mesh sums kept for each snapshot: the force on the mesh, the force
+# magnitude, the magnitude-weighted contact point and the contact count
+SUM_COLUMNS = 8
+CSV_HEADER = "timestep,time,mesh,fx,fy,fz,copx,copy,copz,impulse_x,impulse_y,impulse_z,contacts"
+
+def find_force_files(post_dir):
+    """Return the contact force dump files in a post directory, in name order."""
+    return sorted(os.path.join(post_dir, name) for name in os.listdir(post_dir) if FORCE_PATTERN.match(name))
+
+def index_force_dumps(post_dir):
+    """Index every snapshot of the contact force dumps in a post directory, sorted by timestep."""
+    filepaths = find_force_files(post_dir)
+    single = len(filepaths) > 1
+    frames = [frame for filepath in filepaths for frame in index_text_dump(filepath, single)]
+    for frame in frames:
+        if len(frame.columns) != len(FORCE_COLUMNS):
+            raise ValueError(f"{frame.filepath} has {len(frame.columns)} columns per contact, not {len(FORCE_COLUMNS)}")
+    return sorted(frames, key=lambda frame: frame.timestep)
+
+def aggregate_snapshot(frame, mesh_count):
+    """Reduce one contact force snapshot to (mesh_count, SUM_COLUMNS) per-mesh sums.
+
+    Contacts on meshes outside the first mesh_count are ignored.
+    """
+    sums = np.zeros((mesh_count, SUM_COLUMNS))
+    for block in iter_frame_blocks(frame):
+        meshes = block[:, MESH].astype(np.int64)
+        inside = (meshes >= 0) & (meshes < mesh_count)
+        meshes = meshes[inside]
+        # The compute reports the force on the particle; the mesh feels the reaction
+        force = -block[inside, FORCE]
+        magnitude = np.linalg.norm(force, axis=1)
+        weighted = block[inside, CONTACT] * magnitude[:, None]
+        for column, values in enumerate((force[:, 0], force[:, 1], force[:, 2], magnitude,
+                                         weighted[:, 0], weighted[:, 1], weighted[:, 2])):
+            sums[:, column] += np.bincount(meshes, values, minlength=mesh_count)
+        sums[:, 7] += np.bincount(meshes, minlength=mesh_count)
+    return sums
+
+def iter_contact_forces(frames, mesh_count):
+    """Aggregate indexed force snapshots one at a time, yielding (done, total) after each.
+
+    Returns the snapshot timesteps and their (snapshots, mesh_count,
+    SUM_COLUMNS) per-mesh sums.
+    """
+    timesteps = np.array([frame.timestep for frame in frames], dtype=np.int64)
+    sums = np.zeros((len(frames), mesh_count, SUM_COLUMNS))
+    for index, frame in enumerate(frames):
+        sums[index] = aggregate_snapshot(frame, mesh_count)
+        yield index + 1, len(frames)
+    return timesteps, sums
+
+def force_series(timesteps, sums, timestep):
+    """Turn per-snapshot sums into per-mesh force, centre of pressure, impulse and contact count series.
+
+    Each snapshot's force is taken as constant until the next snapshot, so
+    its impulse is the force times that interval; the last snapshot reuses
+    the interval before it. The centre of pressure is the force-weighted
+    mean contact point and is NaN while a mesh has no contacts.
+    """
+    times = timesteps * timestep
+    intervals = np.diff(times, append=times[-1:] + (times[-1] - times[-2] if len(times) > 1 else 0.0))
+    force = sums[..., 0:3]
+    magnitude = sums[..., 3:4]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        centre = np.where(magnitude > 0, sums[..., 4:7] / magnitude, np.nan)
+    return {
+        "timestep": timesteps,
+        "time": times,
+        "force": force,
+        "centre_of_pressure": centre,
+        "impulse": force * intervals[:, None, None],
+        "contacts": sums[..., 7].astype(np.int64),
+    }
+
+def write_force_series(case_dir, series, mesh_names):
+    """Write a force series as contact_forces.npz and a long-format contact_forces.csv in case_dir."""
+    np.savez_compressed(os.path.join(case_dir, "contact_forces.npz"), meshes=np.array(mesh_names), **series)
+    snapshot_count, mesh_count = series["contacts"].shape
+    rows = np.column_stack((
+        np.repeat(series["timestep"], mesh_count),
+        np.repeat(series["time"], mesh_count),
+        np.tile(np.arange(mesh_count), snapshot_count),
+        series["force"].reshape(-1, 3),
+        series["centre_of_pressure"].reshape(-1, 3),
+        series["impulse"].reshape(-1, 3),
+        series["contacts"].reshape(-1),
+    ))
+    with open(os.path.join(case_dir, "contact_forces.csv"), "w") as file:
+        file.write(CSV_HEADER + "\n")
+        for row in rows:
+            file.write(f"{int(row[0])},{row[1]:.9g},{mesh_names[int(row[2])]},"
+                       + ",".join(f"{value:.9g}" for value in row[3:12]) + f",{int(row[12])}\n")
@@ -0,0 +1,89 @@
+import math
+
+BYTES_PER_PARTICLE = 1024  # per-atom arrays, contact history and neighbour list entries of a granular atom
+BYTES_PER_BIN = 8  # bin head and stencil bookkeeping per neighbour bin
+BYTES_PER_TRIANGLE = 512  # mesh node, neighbour and contact bookkeeping per wall triangle
+CORE_SECONDS_PER_PARTICLE_STEP = 2e-6  # typical granular Hertz model throughput of one core
+DUMP_TEXT_BYTES_PER_VALUE = 13  # a %g value and its separator in a text custom dump
+DUMP_BINARY_BYTES_PER_VALUE = 8  # binary custom dumps store every value as a double
+DUMP_GZIP_RATIO = 0.4  # typical gzip compression of a text particle dump
+DUMP_VTK_BYTES_PER_TRIANGLE = 150  # points and cell of one triangle in an ASCII mesh/vtk dump
+
+def neighbour_cutoff(radius):
+    """Return the neighbour cutoff of the generated scripts: a contact distance plus a skin of one radius."""
+    return 3 * radius
+
+def bin_count(sim_min, sim_max, radius):
+    """Return the number of neighbour bins LIGGGHTS allocates for the domain (bins of half the cutoff)."""
+    size = neighbour_cutoff(radius) / 2
+    return math.prod(max(1, math.ceil((sim_max[axis] - sim_min[axis]) / size)) for axis in range(3))
+
+def ghost_fraction(sim_min, sim_max, grid, radius):
+    """Return the ghost shell volume of one interior subdomain relative to the subdomain itself.
+
+    The generated domain is not periodic, so only axes split over more than
+    one rank have neighbouring subdomains to exchange ghosts with.
+    """
+    cutoff = neighbour_cutoff(radius)
+    sizes = [max(cutoff, (sim_max[axis] - sim_min[axis]) / grid[axis]) for axis in range(3)]
+    shell = math.prod(size + 2 * cutoff if grid[axis] > 1 else size for axis, size in enumerate(sizes))
+    return shell / math.prod(sizes) - 1
+
+def estimate_cost(particle_count, total_steps, radius, sim_min, sim_max, processor_plan=None, mesh_triangles=0):
+    """Estimate the memory and runtime of a simulation.
+
+    The busiest rank of the processors plan sets both the per-rank memory
+    and the wall time. Returns a cost dictionary.
+    """
+    if processor_plan is None:
+        ranks, grid, busiest = 1, (1, 1, 1), particle_count
+    else:
+        ranks, grid, busiest = processor_plan["ranks"], processor_plan["grid"], processor_plan["busiest_rank_particles"]
+    owned_and_ghost = busiest * (1 + ghost_fraction(sim_min, sim_max, grid, radius))
+    bins = bin_count(sim_min, sim_max, radius)
+    memory = owned_and_ghost * BYTES_PER_PARTICLE + bins / ranks * BYTES_PER_BIN + mesh_triangles * BYTES_PER_TRIANGLE
+    core_seconds = particle_count * total_steps * CORE_SECONDS_PER_PARTICLE_STEP
+    wall_seconds = owned_and_ghost * total_steps * CORE_SECONDS_PER_PARTICLE_STEP
+    return {
+        "particles": particle_count,
+        "ranks": ranks,
+        "bins": bins,
+        "memory_per_rank": memory,
+        "steps": total_steps,
+        "core_hours": core_seconds / 3600,
+        "wall_hours": wall_seconds / 3600,
+    }
+
+def describe_cost(cost):
+    """Return a one-line summary of a cost estimate."""
+    return (f"~{cost['particles']} particles, {cost['bins']} bins, ~{cost['memory_per_rank'] / 2 ** 20:.0f} MiB per rank, "
+            f"{cost['steps']} steps: ~{cost['wall_hours']:.1f} h on {cost['ranks']} ranks ({cost['core_hours']:.1f} core-hours)")
+
+def dump_count(run_steps, every):
+    """Return how many times a dump fires over a run, counting the one at its first step."""
+    return run_steps // every + 1
+
+def estimate_dump_size(particle_count, dumps, field_count, dump_format="TEXT", particle_fraction=1.0, mesh_triangles=0):
+    """Estimate the total bytes written by the particle dump and the moving meshes' VTK dump.
+
+    particle_fraction is the share of the particles inside the dump region.
+    """
+    per_value = DUMP_BINARY_BYTES_PER_VALUE if dump_format == 'BINARY' else DUMP_TEXT_BYTES_PER_VALUE
+    particle_bytes = particle_count * particle_fraction * field_count * per_value
+    if dump_format == 'GZIP':
+        particle_bytes *= DUMP_GZIP_RATIO
+    return dumps * (particle_bytes + mesh_triangles * DUMP_VTK_BYTES_PER_TRIANGLE)
+
+def wall_contact_count(bed_min, bed_max, radius):
+    """Estimate the wall contacts of a settled bed: one per particle of its bottom layer, resting on the floor."""
+    area = max(0.0, bed_max[0] - bed_min[0]) * max(0.0, bed_max[1] - bed_min[1])
+    return math.ceil(area / (2 * radius) ** 2)
+
+def estimate_force_dump_size(contacts, dumps, column_count):
+    """Estimate the total bytes written by the local text dump of the wall contact forces."""
+    return dumps * contacts * column_count * DUMP_TEXT_BYTES_PER_VALUE
+
+def describe_dump_size(cost):
+    """Return a one-line summary of a cost estimate's dump output, contact force dumps included."""
+    forces = f" and {cost['force_dumps']} contact force dumps" if cost.get("force_dumps") else ""
+    return f"{cost['dumps']} dumps{forces}: ~{cost['dump_bytes'] / 2 ** 30:.2f} GiB of output"
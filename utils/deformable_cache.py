@@ -0,0 +1,139 @@
+import os
+import json
+import hashlib
+import numpy as np
+from .stl_writer import write_stl
+
+DEFORMABLE_MANIFEST = "deformable_manifest.json"
+CACHE_DIR = "deformable_cache"
+
+def cache_paths(output_dir, name):
+    """Return the topology and position cache paths of a deformable object."""
+    cache_dir = os.path.join(output_dir, CACHE_DIR)
+    return os.path.join(cache_dir, f"{name}_topology.npy"), os.path.join(cache_dir, f"{name}_positions.npy")
+
+def create_position_cache(output_dir, name, topology, vertex_count, frame_count):
+    """Write an object's triangle topology and allocate its (frames, vertices, 3) position memmap."""
+    topology_path, positions_path = cache_paths(output_dir, name)
+    os.makedirs(os.path.dirname(topology_path), exist_ok=True)
+    np.save(topology_path, np.asarray(topology, dtype=np.int32))
+    positions = np.lib.format.open_memmap(positions_path, mode="w+", dtype=np.float32, shape=(frame_count, vertex_count, 3))
+    positions.flush()
+    return positions
+
+def open_position_cache(output_dir, name, mode="r"):
+    """Open an object's cached topology and memory-mapped world-space positions."""
+    topology_path, positions_path = cache_paths(output_dir, name)
+    return np.load(topology_path), np.load(positions_path, mmap_mode=mode)
+
+def cached_triangles(output_dir, name, frame_index):
+    """Return the (n, 3, 3) world-space triangles of one cached frame without loading the others."""
+    topology, positions = open_position_cache(output_dir, name)
+    return np.asarray(positions[frame_index])[topology]
+
+def chunk_ranges(manifest, chunk_frames=64):
+    """Return the (first, last) cache frame indices of each chunk of a manifest's frame range, for one object.
+
+    Consecutive chunks overlap by one frame so that every pair of
+    consecutive frames appears in some chunk.
+    """
+    first = manifest["frame_start"] - manifest["cache_start"]
+    last = manifest["frame_end"] - manifest["cache_start"]
+    return [(start, min(last, start + chunk_frames)) for start in range(first, max(first + 1, last), chunk_frames)]
+
+def cached_chunks(output_dir, manifest, chunk_frames=64):
+    """Yield the cached positions of a manifest's frame range in chunks of frames, one object at a time; see chunk_ranges."""
+    for name in manifest["frames"]:
+        _, positions = open_position_cache(output_dir, name)
+        for start, end in chunk_ranges(manifest, chunk_frames):
+            yield np.asarray(positions[start:end + 1], dtype=np.float64)
+
+def iter_deformable_extent(output_dir, manifest, frame_rate):
+    """Scan the cached sequences once, yielding (chunks done, chunk count) after each chunk.
+
+    Returns the box swept by the vertices over the manifest's frame range
+    and the fastest vertex speed, both from the same pass over the
+    position memmaps.
+    """
+    total = len(manifest["frames"]) * len(chunk_ranges(manifest))
+    low = np.full(3, np.inf)
+    high = np.full(3, -np.inf)
+    speed = 0.0
+    for done, chunk in enumerate(cached_chunks(output_dir, manifest), 1):
+        points = chunk.reshape(-1, 3)
+        low = np.minimum(low, points.min(axis=0))
+        high = np.maximum(high, points.max(axis=0))
+        if len(chunk) > 1:
+            speed = max(speed, float(np.linalg.norm(np.diff(chunk, axis=0), axis=-1).max()) * frame_rate)
+        yield done, total
+    return (low.tolist(), high.tolist()), speed
+
+def position_digest(positions, tolerance=0.0):
+    """Hash one frame of vertex positions, optionally snapping them to a tolerance grid first."""
+    if tolerance > 0:
+        data = np.round(np.asarray(positions, dtype=np.float64) / tolerance).astype(np.int64)
+    else:
+        data = np.ascontiguousarray(positions, dtype=np.float32)
+    return hashlib.sha1(data.tobytes()).hexdigest()
+
+def materialize_stl(output_dir, filename, ascii_format=False, manifest=None, overwrite=False):
+    """Write one STL of a deformable manifest from the cache unless it already exists."""
+    filepath = os.path.join(output_dir, filename)
+    if os.path.exists(filepath) and not overwrite:
+        return False
+    if manifest is None:
+        manifest = read_deformable_manifest(os.path.join(output_dir, DEFORMABLE_MANIFEST))
+    source = manifest["unique"][filename]
+    triangles = cached_triangles(output_dir, source["object"], source["frame"] - manifest["cache_start"])
+    write_stl(filepath, triangles, ascii_format=ascii_format, name=source["object"])
+    return True
+
+def materialize_deformable_stls(output_dir, manifest, ascii_format=False, overwrite=False):
+    """Write every STL referenced by a deformable manifest, skipping existing files unless overwrite is set."""
+    return sum(materialize_stl(output_dir, filename, ascii_format, manifest, overwrite) for filename in manifest["unique"])
+
+def write_deformable_manifest(manifest_path, manifest):
+    """Write the frame -> STL manifest of a deformable export."""
+    with open(manifest_path, "w") as file:
+        json.dump(manifest, file, indent=1)
+
+def read_deformable_manifest(manifest_path):
+    """Read a deformable manifest, restoring integer frame keys."""
+    with open(manifest_path) as file:
+        manifest = json.load(file)
+    manifest["frames"] = {
+        name: {int(frame): filename for frame, filename in frames.items()}
+        for name, frames in manifest["frames"].items()
+    }
+    return manifest
+
+def merge_deformable_manifests(output_dir, chunk_manifests):
+    """Merge the manifests of consecutive frame chunks into one.
+
+    A chunk always records its first frame as unique, so when it matches the
+    previous chunk's last unique frame it is remapped to that earlier file.
+    """
+    first, last = chunk_manifests[0], chunk_manifests[-1]
+    frames = {}
+    unique = {}
+    for chunk in chunk_manifests:
+        for name, chunk_frames in chunk["frames"].items():
+            object_frames = frames.setdefault(name, {})
+            previous_file = object_frames[max(object_frames)] if object_frames else None
+            first_file = chunk_frames[min(chunk_frames)]
+            duplicate = previous_file is not None and unique[previous_file]["digest"] == chunk["unique"][first_file]["digest"]
+            for frame, filename in sorted(chunk_frames.items()):
+                object_frames[frame] = previous_file if duplicate and filename == first_file else filename
+        unique.update(chunk["unique"])
+
+    used = {filename for object_frames in frames.values() for filename in object_frames.values()}
+    manifest = {
+        "cache_start": first["cache_start"],
+        "frame_start": first["frame_start"],
+        "frame_end": last["frame_end"],
+        "tolerance": first.get("tolerance", 0.0),
+        "frames": frames,
+        "unique": {filename: source for filename, source in unique.items() if filename in used},
+    }
+    write_deformable_manifest(os.path.join(output_dir, DEFORMABLE_MANIFEST), manifest)
+    return manifest
@@ -0,0 +1,26 @@
+"""Background Blender entry point that caches one chunk of a deformable mesh sequence.
+
+Run as: blender -b scene.blend --python deformable_worker.py -- import_dir
+package output_dir frame_start frame_end cache_start tolerance manifest_path object_name...
+"""
+import sys
+import importlib
+
+def main(argv):
+    import_dir, package, output_dir, frame_start, frame_end, cache_start, tolerance, manifest_path, *object_names = argv
+    sys.path.insert(0, import_dir)
+    mesh_utils = importlib.import_module(f"{package}.utils.mesh_utils")
+    workers = importlib.import_module(f"{package}.utils.workers")
+
+    import bpy
+    objects = [bpy.data.objects[name] for name in object_names]
+    mesh_utils.export_deformable_stls(
+        output_dir, objects, int(frame_start), int(frame_end),
+        tolerance=float(tolerance),
+        manifest_path=manifest_path,
+        progress=workers.report_progress,
+        cache_start=int(cache_start),
+    )
+
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index("--") + 1:])
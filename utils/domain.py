@@ -0,0 +1,123 @@
+import math
+import numpy as np
+
+INSERTION_VOLUME_FRACTION = 0.6  # volumefraction_region used by fix insert/pack
+SETTLED_VOLUME_FRACTION = 0.64  # random close packing of a settled bed of spheres
+BALANCE_THRESHOLD = 1.2  # imbalance above which load balancing is emitted
+
+def box_volume(bounds_min, bounds_max):
+    """Return the volume of an axis-aligned box."""
+    return max(0.0, bounds_max[0] - bounds_min[0]) * max(0.0, bounds_max[1] - bounds_min[1]) * max(0.0, bounds_max[2] - bounds_min[2])
+
+def union_bounds(boxes):
+    """Return the axis-aligned box enclosing every (min, max) box."""
+    boxes = list(boxes)
+    low = [min(box[0][axis] for box in boxes) for axis in range(3)]
+    high = [max(box[1][axis] for box in boxes) for axis in range(3)]
+    return low, high
+
+def pad_bounds(bounds_min, bounds_max, padding):
+    """Grow a box by padding on every side."""
+    return [value - padding for value in bounds_min[:3]], [value + padding for value in bounds_max[:3]]
+
+def clipped_axes(inner_min, inner_max, outer_min, outer_max):
+    """Return the names of the box faces where inner sticks out of outer."""
+    faces = []
+    for axis, name in enumerate("xyz"):
+        if inner_min[axis] < outer_min[axis]:
+            faces.append(f"-{name}")
+        if inner_max[axis] > outer_max[axis]:
+            faces.append(f"+{name}")
+    return faces
+
+def rigid_swept_bounds(world_matrices, local_corners):
+    """Return the box swept by the bounding-box corners of rigid objects over every sampled frame.
+
+    local_corners holds an (8, 3) array of local bound_box corners per object.
+    """
+    corners = np.asarray(local_corners, dtype=np.float64)
+    points = np.einsum("fnij,ncj->fnci", world_matrices[..., :3, :3], corners) + world_matrices[:, :, None, :3, 3]
+    points = points.reshape(-1, 3)
+    return points.min(axis=0).tolist(), points.max(axis=0).tolist()
+
+def estimate_particle_count(ins_min, ins_max, radius, volume_fraction=INSERTION_VOLUME_FRACTION):
+    """Estimate how many particles of the given radius insert/pack puts into the insertion volume."""
+    return int(box_volume(ins_min, ins_max) * volume_fraction / (4 / 3 * math.pi * radius ** 3))
+
+def overlap_fraction(box_min, box_max, region_min, region_max):
+    """Return the share of a box's volume that lies inside a region."""
+    volume = box_volume(box_min, box_max)
+    if volume <= 0:
+        return 0.0
+    overlap = [max(0.0, min(box_max[axis], region_max[axis]) - max(box_min[axis], region_min[axis])) for axis in range(3)]
+    return math.prod(overlap) / volume
+
+def settled_bed_bounds(sim_min, sim_max, ins_min, ins_max, floor_z=None):
+    """Estimate the box the particles occupy once the inserted volume has settled under gravity.
+
+    The bed keeps the insertion volume's footprint, rests on floor_z (the
+    bottom of the domain by default) and is compacted from the insertion
+    packing to random close packing.
+    """
+    low = [max(sim_min[axis], ins_min[axis]) for axis in range(3)]
+    high = [min(sim_max[axis], ins_max[axis]) for axis in range(3)]
+    low[2] = sim_min[2] if floor_z is None else max(sim_min[2], floor_z)
+    height = (ins_max[2] - ins_min[2]) * INSERTION_VOLUME_FRACTION / SETTLED_VOLUME_FRACTION
+    high[2] = min(sim_max[2], low[2] + height)
+    return low, high
+
+def _slab_fractions(domain_low, domain_high, bed_low, bed_high, count):
+    """Return the fraction of a bed's extent that falls into each of `count` equal slabs of the domain."""
+    width = (domain_high - domain_low) / count
+    extent = bed_high - bed_low
+    fractions = []
+    for index in range(count):
+        low = domain_low + index * width
+        overlap = max(0.0, min(bed_high, low + width) - max(bed_low, low))
+        fractions.append(overlap / extent if extent > 0 else 1.0 / count)
+    return fractions
+
+def _factorizations(ranks):
+    """Yield every (px, py, pz) with px * py * pz == ranks."""
+    for px in range(1, ranks + 1):
+        if ranks % px:
+            continue
+        for py in range(1, ranks // px + 1):
+            if (ranks // px) % py == 0:
+                yield px, py, ranks // px // py
+
+def plan_processors(ranks, sim_min, sim_max, bed_min, bed_max, particle_count):
+    """Choose the processors grid that spreads the settled bed most evenly over MPI ranks.
+
+    LIGGGHTS splits the domain into equal slabs along each axis, so the
+    busiest rank holds the product of the largest per-axis bed fractions.
+    Ties are broken by the subdomain surface area, which drives ghost
+    communication. Returns a plan dictionary.
+    """
+    best = None
+    for grid in _factorizations(ranks):
+        busiest = 1.0
+        for axis in range(3):
+            busiest *= max(_slab_fractions(sim_min[axis], sim_max[axis], bed_min[axis], bed_max[axis], grid[axis]))
+        sizes = [(sim_max[axis] - sim_min[axis]) / grid[axis] for axis in range(3)]
+        surface = sizes[0] * sizes[1] + sizes[1] * sizes[2] + sizes[0] * sizes[2]
+        key = (round(busiest, 9), surface)
+        if best is None or key < best[0]:
+            best = (key, grid, busiest)
+
+    _, grid, busiest = best
+    imbalance = busiest * ranks
+    return {
+        "ranks": ranks,
+        "grid": grid,
+        "particles_per_rank": particle_count / ranks,
+        "busiest_rank_particles": int(busiest * particle_count),
+        "imbalance": imbalance,
+        "balance": imbalance > BALANCE_THRESHOLD,
+    }
+
+def describe_plan(plan):
+    """Return a one-line summary of a processors plan."""
+    px, py, pz = plan["grid"]
+    return (f"{plan['ranks']} ranks as {px}x{py}x{pz}: ~{plan['particles_per_rank']:.0f} particles per rank, "
+            f"busiest rank ~{plan['busiest_rank_particles']} (imbalance {plan['imbalance']:.2f})")
@@ -0,0 +1,224 @@
+import os
+import re
+import gzip
+import struct
+import bisect
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+DUMP_PATTERN = re.compile(r"^dump.*\.(txt|txt\.gz|bin)$")  # particle dumps written by the run script
+READ_BLOCK = 1 << 20
+
+# One snapshot of a dump file. Text snapshots span the bytes [offset, end) of
+# the (decompressed) file, with end None when they run to its end; binary
+# snapshots are a list of (offset, value count) chunks.
+DumpFrame = namedtuple("DumpFrame", "timestep filepath count columns offset end chunks")
+
+def open_dump(filepath):
+    """Open a dump file for binary reading, decompressing .gz files on the fly."""
+    return gzip.open(filepath, "rb") if filepath.endswith(".gz") else open(filepath, "rb")
+
+def find_dump_files(post_dir):
+    """Return the particle dump files in a post directory, in name order."""
+    return sorted(os.path.join(post_dir, name) for name in os.listdir(post_dir) if DUMP_PATTERN.match(name))
+
+def read_script_settings(script_path):
+    """Read the equal-style variables, the particle dump columns and the wall meshes of a generated run script.
+
+    meshes lists the meshes of the cont1 wall fix in the order the contact
+    force compute numbers them.
+    """
+    variables = {}
+    columns = None
+    meshes = None
+    with open(script_path) as file:
+        for line in file:
+            words = line.split()
+            if len(words) == 4 and words[0] == "variable" and words[2] == "equal":
+                variables[words[1]] = words[3]
+            elif len(words) > 6 and words[:4] == ["dump", "dmp", "all", "custom"]:
+                columns = words[6:]
+            elif words[:4] == ["fix", "cont1", "all", "wall/gran"] and "meshes" in words:
+                meshes = words[words.index("meshes") + 1:]
+    return {"variables": variables, "columns": columns, "meshes": meshes}
+
+def skip_lines(file, count):
+    """Advance a file past count newlines without decoding them."""
+    while count > 0:
+        start = file.tell()
+        block = file.read(READ_BLOCK)
+        if not block:
+            raise ValueError(f"{file.name} ends {count} lines early")
+        found = block.count(b"\n")
+        if found < count:
+            count -= found
+            continue
+        position = -1
+        for _ in range(count):
+            position = block.index(b"\n", position + 1)
+        file.seek(start + position + 1)
+        return
+
+def index_text_dump(filepath, single=False):
+    """Index the snapshots of a text dump, per-atom or local, from their headers.
+
+    With single, the file is known to hold one snapshot (the run script's
+    dump*.txt pattern writes one file per dump), so only its header is read.
+    """
+    frames = []
+    with open_dump(filepath) as file:
+        while True:
+            line = file.readline()
+            if not line:
+                break
+            if not line.startswith(b"ITEM: TIMESTEP"):
+                continue
+            timestep = int(file.readline())
+            count = None
+            while True:
+                line = file.readline()
+                if not line:
+                    raise ValueError(f"{filepath} ends inside a snapshot header")
+                if line.startswith((b"ITEM: NUMBER OF ATOMS", b"ITEM: NUMBER OF ENTRIES")):
+                    count = int(file.readline())
+                elif line.startswith((b"ITEM: ATOMS", b"ITEM: ENTRIES")):
+                    break
+            columns = line.decode().split()[2:]
+            offset = file.tell()
+            if single:
+                frames.append(DumpFrame(timestep, filepath, count, columns, offset, None, None))
+                break
+            skip_lines(file, count)
+            frames.append(DumpFrame(timestep, filepath, count, columns, offset, file.tell(), None))
+    return frames
+
+def index_binary_dump(filepath, columns):
+    """Index the snapshots of a binary custom dump.
+
+    Binary dumps do not record their column names, so they are passed in,
+    usually from the run script. The header layout is the one written by
+    the LAMMPS version LIGGGHTS 3 is based on.
+    """
+    frames = []
+    with open(filepath, "rb") as file:
+        while True:
+            header = file.read(16)
+            if len(header) < 16:
+                break
+            timestep, count = struct.unpack("<qq", header)
+            triclinic, = struct.unpack("<i", file.read(4))
+            file.seek(6 * 4 + 6 * 8 + (3 * 8 if triclinic else 0), os.SEEK_CUR)
+            size_one, chunk_count = struct.unpack("<ii", file.read(8))
+            if size_one != len(columns):
+                raise ValueError(f"{filepath} has {size_one} columns per particle, not {len(columns)}")
+            chunks = []
+            for _ in range(chunk_count):
+                values, = struct.unpack("<i", file.read(4))
+                chunks.append((file.tell(), values))
+                file.seek(values * 8, os.SEEK_CUR)
+            frames.append(DumpFrame(timestep, filepath, count, list(columns), None, None, chunks))
+    return frames
+
+def index_dumps(post_dir, columns=None):
+    """Index every snapshot of the particle dumps in a post directory, sorted by timestep.
+
+    columns names the values of binary dumps.
+    """
+    filepaths = find_dump_files(post_dir)
+    single = len(filepaths) > 1
+    frames = []
+    for filepath in filepaths:
+        if filepath.endswith(".bin"):
+            if columns is None:
+                raise ValueError(f"{filepath} is a binary dump; its columns must be given")
+            frames.extend(index_binary_dump(filepath, columns))
+        else:
+            frames.extend(index_text_dump(filepath, single))
+    return sorted(frames, key=lambda frame: frame.timestep)
+
+def read_frame(frame):
+    """Parse one snapshot into a (particles, columns) float64 array."""
+    width = len(frame.columns)
+    if frame.chunks is not None:
+        with open(frame.filepath, "rb") as file:
+            parts = []
+            for offset, values in frame.chunks:
+                file.seek(offset)
+                parts.append(np.fromfile(file, dtype="<f8", count=values))
+        data = np.concatenate(parts) if parts else np.zeros(0)
+    else:
+        with open_dump(frame.filepath) as file:
+            file.seek(frame.offset)
+            block = file.read() if frame.end is None else file.read(frame.end - frame.offset)
+        data = np.fromstring(block, dtype=np.float64, sep=" ")
+    if data.size != frame.count * width:
+        raise ValueError(f"{frame.filepath} timestep {frame.timestep}: expected {frame.count} x {width} values, read {data.size}")
+    return data.reshape(frame.count, width)
+
+def iter_frame_blocks(frame, block_bytes=READ_BLOCK * 16):
+    """Yield a text snapshot as (rows, columns) float64 arrays of about block_bytes each.
+
+    Only one block is held in memory at a time, so snapshots larger than
+    memory can be aggregated.
+    """
+    width = len(frame.columns)
+    rows = 0
+    with open_dump(frame.filepath) as file:
+        file.seek(frame.offset)
+        remaining = None if frame.end is None else frame.end - frame.offset
+        tail = b""
+        while remaining is None or remaining > 0:
+            block = file.read(block_bytes if remaining is None else min(block_bytes, remaining))
+            if not block:
+                break
+            if remaining is not None:
+                remaining -= len(block)
+            block = tail + block
+            cut = block.rfind(b"\n") + 1
+            block, tail = block[:cut], block[cut:]
+            values = np.fromstring(block, dtype=np.float64, sep=" ")
+            if values.size:
+                rows += values.size // width
+                yield values.reshape(-1, width)
+        if tail.strip():
+            values = np.fromstring(tail, dtype=np.float64, sep=" ")
+            rows += values.size // width
+            yield values.reshape(-1, width)
+    if rows != frame.count:
+        raise ValueError(f"{frame.filepath} timestep {frame.timestep}: expected {frame.count} rows, read {rows}")
+
+class DumpSeries:
+    """The indexed snapshots of a post directory with an LRU cache of decoded frames."""
+
+    def __init__(self, post_dir, columns=None, cache_size=4):
+        self.frames = index_dumps(post_dir, columns)
+        self.timesteps = [frame.timestep for frame in self.frames]
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def __len__(self):
+        return len(self.frames)
+
+    def index_at(self, timestep):
+        """Return the index of the last snapshot at or before timestep, clamped to the first."""
+        return max(0, bisect.bisect_right(self.timesteps, timestep) - 1)
+
+    def data(self, index):
+        """Return the decoded array of snapshot index, reading it only on a cache miss."""
+        if index in self.cache:
+            self.cache.move_to_end(index)
+            return self.cache[index]
+        data = read_frame(self.frames[index])
+        self.cache[index] = data
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return data
+
+    def particles(self, index):
+        """Return the (n, 3) positions and the radii of snapshot index; radii are None if not dumped."""
+        columns = self.frames[index].columns
+        data = self.data(index)
+        positions = data[:, [columns.index(name) for name in ("x", "y", "z")]]
+        radii = data[:, columns.index("radius")] if "radius" in columns else None
+        return positions, radii
@@ -0,0 +1,51 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+EXPORT_MANIFEST = "export_manifest.json"
+# Modules whose code shapes the generated scripts: the script writers and everything they import for it
+SCRIPT_SOURCES = ("file_writer.py", "commands.py", "motion.py", "domain.py", "restart_cache.py", "timestep.py",
+                  "transform_sampling.py", "contact_forces.py")
+
+def inputs_digest(*parts):
+    """Hash a mix of numpy arrays and JSON-serialisable values."""
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(str(part.shape).encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+def script_sources_digest():
+    """Hash the generator code itself, so that updating the addon regenerates the scripts."""
+    digest = hashlib.sha1()
+    for filename in SCRIPT_SOURCES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), filename), "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+def read_export_manifest(output_dir, options):
+    """Read the previous export's manifest, dropping its mesh records if the export options changed."""
+    manifest = {"options": options, "meshes": {}, "deformable": {}, "scripts": {}}
+    filepath = os.path.join(output_dir, EXPORT_MANIFEST)
+    if not os.path.exists(filepath):
+        return manifest
+    with open(filepath) as file:
+        previous = json.load(file)
+    manifest["scripts"] = previous.get("scripts", {})
+    if previous.get("options") == options:
+        manifest["meshes"] = previous.get("meshes", {})
+        manifest["deformable"] = previous.get("deformable", {})
+    return manifest
+
+def write_export_manifest(output_dir, manifest):
+    """Write the export manifest of an output directory."""
+    with open(os.path.join(output_dir, EXPORT_MANIFEST), "w") as file:
+        json.dump(manifest, file, indent=1)
+
+def is_current(records, key, digest, filepath):
+    """Return whether a file was written from inputs with this digest and still exists."""
+    return records.get(key, {}).get("digest") == digest and os.path.exists(filepath)
@@ -2,231 +2,517 @@ import os
 import math
 
 import bpy
+import numpy as np
+from .contact_forces import FORCE_COLUMNS
+from .commands import Blank, Command, Comment, Dump, Fix, Region, Run, Section, Undump, Unfix, Variable, iter_write_commands, merge_runs
+from .domain import describe_plan
+from .motion import compress_motion, frame_motion, pivot_velocities, rotation_axes_periods
+from .profiling import span
+from .steps import drain
+from .restart_cache import RESTART_FILE
+from .transform_sampling import sample_world_matrices
+
+SETTLE_STEPS = 200000  # default cap on the steps run in setup.liggghts for the inserted particles to settle
+INSERT_EVERY = 10000  # steps between insert/pack insertions during settling
+WARMUP_STEPS = 4000  # least steps run from the restart before the moving objects start, rounded up to whole frames
+# Dump custom attributes of each selectable field, in output order
+DUMP_FIELDS = {
+    'ID': "id",
+    'TYPE': "type",
+    'POSITION': "x y z",
+    'VELOCITY': "vx vy vz",
+    'FORCE': "fx fy fz",
+    'OMEGA': "omegax omegay omegaz",
+    'RADIUS': "radius",
+}
+# LIGGGHTS picks the dump encoding from the file name: .gz is gzipped text, .bin is binary
+DUMP_FILES = {
+    'TEXT': "post/dump*.txt",
+    'GZIP': "post/dump*.txt.gz",
+    'BINARY': "post/dump*.bin",
+}
+FORCE_DUMP_FILE = "post/force*.txt"  # local dumps of the wall contact forces, one file per dump
+PARTIAL_SUFFIX = ".partial"  # staged files are written under this suffix and renamed once complete
 
 def format_float(value, precision=6):
     """Format a floating-point number to a specific precision."""
     return f"{value:.{precision}f}"
 
+def format_bounds(bounds_min, bounds_max):
+    """Format min/max corners as the 'xlo xhi ylo yhi zlo zhi' arguments of a block region."""
+    return " ".join(f"{format_float(bounds_min[axis])} {format_float(bounds_max[axis])}" for axis in range(3))
+
+def system_variable_commands(simulation_params):
+    """Yield the variables shared by the setup and run scripts."""
+    yield Section("SYSTEM VARIABLES")
+    yield Variable("r", "equal", format_float(simulation_params['radius']))
+    yield Variable("E", "equal", format_float(simulation_params['youngs_modulus']))
+    yield Variable("f", "equal", "0.8")
+    yield Variable("c", "equal", format_float(simulation_params['cohesion']))
+    yield Variable("d", "equal", format_float(simulation_params['density']))
+    yield Variable("v", "equal", format_float(simulation_params['poisson_ratio']))
+    timestep = simulation_params['timestep']
+    # An automatic timestep divides the frame duration exactly, which only the full precision keeps
+    yield Variable("s", "equal", repr(float(timestep)) if simulation_params.get('auto_timestep') else f"{timestep:.6e}")
+
+def simulation_settings_commands():
+    """Yield the unit, atom style, boundary and neighbour settings."""
+    yield Section("SIMULATION SETTINGS")
+    yield Command("units", "si")
+    yield Command("atom_style", "granular")
+    yield Command("boundary", "f f f")
+    yield Command("newton", "off")
+    yield Command("communicate", "single vel yes")
+    yield Command("neighbor", "$r bin")
+    yield Command("neigh_modify", "every 1 delay 0 check yes")
+    yield Blank()
+
+def processor_commands(processor_plan):
+    """Yield the planned MPI processors grid, if any."""
+    if processor_plan is None:
+        return
+    yield Comment(describe_plan(processor_plan))
+    yield Command("processors", " ".join(str(count) for count in processor_plan["grid"]))
+    yield Blank()
+
+def balance_commands(processor_plan, rebalance_now):
+    """Yield shift load balancing when the planned decomposition leaves ranks unevenly loaded."""
+    if processor_plan is None or not processor_plan["balance"]:
+        return
+    yield Section("LOAD BALANCING")
+    if rebalance_now:
+        yield Command("balance", "1.1 shift xyz 10 1.05")
+    yield Fix("bal", "all", "balance", "10000 1.1 shift xyz 10 1.05")
+    yield Blank()
+
+def material_commands(restitution):
+    """Yield the material property fixes."""
+    yield Section("MATERIAL PROPERTIES")
+    yield Fix("m1", "all", "property/global", "youngsModulus peratomtype $E")
+    yield Fix("m2", "all", "property/global", "poissonsRatio peratomtype $v")
+    yield Fix("m3", "all", "property/global", f"coefficientRestitution peratomtypepair 1 {restitution}")
+    yield Fix("m4", "all", "property/global", "coefficientFriction peratomtypepair 1 $f")
+    yield Fix("m5", "all", "property/global", "characteristicVelocity scalar 1.0")
+    yield Fix("m6", "all", "property/global", "cohesionEnergyDensity peratomtypepair 1 $c")
+    yield Blank()
+
+def force_model_commands():
+    """Yield the particle-particle contact model."""
+    yield Section("FORCE MODEL")
+    yield Command("pair_style", "gran model hertz tangential history cohesion sjkr2")
+    yield Command("pair_coeff", "* *")
+    yield Blank()
+
+def integration_commands():
+    """Yield the integrator, gravity and timestep."""
+    yield Section("ADDITIONAL SETTINGS")
+    yield Fix("nsph", "all", "nve/sphere", "")
+    yield Fix("gravi", "all", "gravity", "9.81 vector 0.0 0.0 -1.0")
+    yield Command("timestep", "$s")
+    yield Blank()
+
+def wall_fix_command(fix_id, mesh_ids):
+    """Return the wall/gran fix that makes the given meshes interact with particles."""
+    return Fix(fix_id, "all", "wall/gran", f"model hertz tangential history mesh n_meshes {len(mesh_ids)} meshes {' '.join(mesh_ids)}")
+
+def moving_wall_fix_command(moving_objects):
+    """Return the wall/gran fix for the tray and the moving meshes."""
+    return wall_fix_command("cont1", ["tray"] + [obj.name for obj in moving_objects])
+
+def mesh_dump_command(moving_objects):
+    """Return the VTK dump of the moving meshes."""
+    return Dump("dumpstl1", "all", "mesh/vtk", "$e", "post/footcomp2_*.vtk", " ".join(["id"] + [obj.name for obj in moving_objects]))
+
+def mesh_surface_command(name, mesh_file):
+    """Return the mesh/surface fix that loads a moving mesh from an STL file."""
+    return Fix(name, "all", "mesh/surface", f"file {mesh_file} type 1 curvature_tolerant yes")
+
+def settle_commands(simulation_params):
+    """Yield the settling run, stopping early once the bed is full and at rest when a rest speed is set.
+
+    The loop runs in blocks of whole insertion intervals and stops after a
+    block in which nothing was inserted and the translational plus
+    rotational kinetic energy fell below that of every particle moving at
+    the rest speed. The setup run starts at step 0 and each block runs up
+    to at most settle_max_steps, so the last block is shortened rather
+    than overrunning the cap.
+    """
+    max_steps = simulation_params.get('settle_max_steps', SETTLE_STEPS)
+    rest_speed = simulation_params.get('settle_speed', 0.0)
+    if rest_speed <= 0:
+        yield Run(max_steps)
+        return
+
+    block = INSERT_EVERY * max(1, math.ceil(simulation_params.get('settle_block', INSERT_EVERY) / INSERT_EVERY))
+    yield Variable("settle_max", "equal", str(max_steps))
+    yield Variable("settle_speed", "equal", f"{rest_speed:.6e}")
+    yield Variable("settle_energy", "equal", "0.5*(4.0/3.0*PI*$r^3*$d)*${settle_speed}^2*atoms")
+    yield Variable("settle_ke", "equal", "ke+c_rke")
+    yield Variable("settle_inserted", "equal", "f_ins[1]")
+    yield Variable("settle_next", "equal", f"min(step+{block},v_settle_max)")
+    yield Command("thermo_style", "custom step atoms ke c_rke")
+    yield Command("thermo", str(block))
+    yield Variable("settle_block", "loop", str(max(1, math.ceil(max_steps / block))))
+    yield Command("label", "settle_loop")
+    yield Variable("settle_previous", "equal", "${settle_inserted}")
+    yield Command("run", "${settle_next} upto")
+    yield Command("if", '"${settle_ke} < ${settle_energy} && ${settle_inserted} == ${settle_previous}" then "jump SELF settle_done"')
+    yield Command("next", "settle_block")
+    yield Command("jump", "SELF settle_loop")
+    yield Command("label", "settle_done")
+    yield Variable("settle_steps", "equal", "step")
+    yield Variable("settle_saved", "equal", "v_settle_max-step")
+    yield Command("print", '"Settled after ${settle_steps} steps of at most ${settle_max}, saving ${settle_saved} steps"')
+
+def skipped_setup_commands(restart):
+    """Yield the stand-in setup script used when restart.res already holds the settled bed."""
+    yield Comment(f"{RESTART_FILE} already holds the settled bed for fingerprint {restart['fingerprint']}")
+    yield Comment("Delete it and regenerate to settle again")
+    yield Command("print", f'"Settled bed restored from {RESTART_FILE}, skipping setup"')
+
+def setup_commands(simulation_params, sim_min, sim_max, ins_min, ins_max):
+    """Yield the commands of the setup.liggghts script."""
+    yield Comment("LIGGGHTS setup script generated with Blender->LIGGGHTS Addon")
+    restart = simulation_params.get('restart')
+    if restart is not None and restart['skippable']:
+        yield from skipped_setup_commands(restart)
+        return
+    if simulation_params.get('settle_speed', 0.0) > 0:
+        # jump SELF rereads the script file, which is not possible when it comes in on stdin
+        yield Comment("The settling loop jumps within this file: run it as lmp -in setup.liggghts, not lmp < setup.liggghts")
+    yield Section("SET UP FOLDER FOR OUTPUT")
+    yield Command("shell", "mkdir post")
+    yield Blank()
+
+    yield from system_variable_commands(simulation_params)
+    yield Variable("t", "equal", "1")
+    yield Variable("n", "equal", "round($t/$s)")
+    yield Blank()
+
+    yield from simulation_settings_commands()
+    yield from processor_commands(simulation_params.get('processor_plan'))
+
+    yield Region("domain", "block", f"{format_bounds(sim_min, sim_max)} units box")
+    yield Command("create_box", "1 domain")
+    yield Blank()
+
+    yield from material_commands(0.9)
+
+    yield Section("PARTICLE INSERTION")
+    yield Fix("pts1", "all", "particletemplate/sphere", "15485863 atom_type 1 density constant $d radius constant $r")
+    yield Fix("pdd1", "all", "particledistribution/discrete", "32452843 1 pts1 1.0")
+    yield Region("ins_tray", "block", f"{format_bounds(ins_min, ins_max)} units box")
+    yield Fix("ins", "all", "insert/pack", f"seed 86028157 distributiontemplate pdd1 insert_every {INSERT_EVERY} overlapcheck yes all_in yes region ins_tray volumefraction_region 0.6")
+    yield Blank()
+
+    yield from balance_commands(simulation_params.get('processor_plan'), rebalance_now=False)
+
+    yield Section("WALLS")
+    yield Fix("simtray", "all", "mesh/surface", "file simtray.stl type 1")
+    yield wall_fix_command("cont", ["simtray"])
+    yield Blank()
+
+    yield from force_model_commands()
+    yield from integration_commands()
+
+    yield Section("COMPUTATION")
+    yield Command("compute", "rke all erotate/sphere")
+    yield Command("compute", "mudisp all displace/atom")
+    yield Blank()
+
+    yield Section("DUMP FILES")
+    yield Comment("dump dmp all custom $e post/dump*.txt id x y z radius")
+
+    yield Section("RUN SPECIFICS")
+    yield from settle_commands(simulation_params)
+    yield Unfix("ins")
+    yield Blank()
+
+    yield Command("write_restart", RESTART_FILE)
+    if restart is not None and restart['cache_dir']:
+        # Copied by the addon rather than a shell command, which cannot quote paths portably
+        yield Comment(f"The addon adds {RESTART_FILE} to the restart cache the next time it generates into this directory")
+
+def warmup_steps(timesteps_per_frame):
+    """Return the warm-up run length: WARMUP_STEPS rounded up to whole frames.
+
+    The run script resets the timestep to 0 after reading the restart, so
+    with a whole-frame warm-up every frame starts on a multiple of
+    timesteps_per_frame and dumps every few frames land on frame boundaries.
+    """
+    return math.ceil(WARMUP_STEPS / timesteps_per_frame) * timesteps_per_frame
+
+def run_steps(timesteps_per_frame, frame_count):
+    """Return the timesteps the run script executes."""
+    return warmup_steps(timesteps_per_frame) + (frame_count - 1) * timesteps_per_frame
+
+def simulation_steps(timesteps_per_frame, frame_count, settle_max_steps=SETTLE_STEPS):
+    """Return the most timesteps the setup and run scripts execute."""
+    return settle_max_steps + run_steps(timesteps_per_frame, frame_count)
+
+def dump_field_names(fields):
+    """Return the dump custom attributes of a set of DUMP_FIELDS keys, in output order."""
+    return [name for field, names in DUMP_FIELDS.items() if field in fields for name in names.split()]
+
+def dump_commands(dump, moving_objects):
+    """Yield the particle dump, optionally restricted to a region, and the moving meshes' VTK dump.
+
+    The particle dump is left out when no fields are selected.
+    """
+    if dump['fields']:
+        yield Dump("dmp", "all", "custom", "$e", DUMP_FILES[dump['format']], " ".join(dump['fields']))
+        if dump['region'] is not None:
+            yield Region("dump_box", "block", f"{format_bounds(*dump['region'])} units box")
+            yield Command("dump_modify", "dmp region dump_box")
+    yield mesh_dump_command(moving_objects)
+
+def force_dump_command(every):
+    """Return the local dump of the wall contact force compute, written every given timesteps."""
+    values = " ".join(f"c_fc[{column}]" for column in range(1, len(FORCE_COLUMNS) + 1))
+    return Dump("fdump", "all", "local", str(every), FORCE_DUMP_FILE, values)
+
 def write_setup_file(filepath, simulation_params, sim_min, sim_max, ins_min, ins_max):
     """Write the setup.liggghts file with the given simulation parameters and extents."""
-    with open(filepath, "w") as file:
-        file.write("# LIGGGHTS setup script generated with Blender->LIGGGHTS Addon\n")
-        file.write("#----------SET UP FOLDER FOR OUTPUT----------#\n")
-        file.write("shell mkdir post\n\n")
-
-        file.write("#----------SYSTEM VARIABLES----------#\n")
-        file.write(f"variable r equal {format_float(simulation_params['radius'])}\n")
-        file.write(f"variable E equal {format_float(simulation_params['youngs_modulus'])}\n")
-        file.write(f"variable f equal 0.8\n")
-        file.write(f"variable c equal {format_float(simulation_params['cohesion'])}\n")
-        file.write(f"variable d equal 1200\n")
-        file.write(f"variable v equal {format_float(simulation_params['poisson_ratio'])}\n")
-        file.write(f"variable s equal {simulation_params['timestep']:.6e}\n")
-        file.write(f"variable t equal 1\n")
-        file.write(f"variable n equal round($t/$s)\n\n")
-
-        file.write("#----------SIMULATION SETTINGS----------#\n")
-        file.write("units si\n")
-        file.write("atom_style granular\n")
-        file.write("boundary f f f\n")
-        file.write("newton off\n")
-        file.write("communicate single vel yes\n")
-        file.write("neighbor $r bin\n")
-        file.write("neigh_modify every 1 delay 0 check yes\n\n")
-
-        file.write(f"region domain block {format_float(sim_min[0])} {format_float(sim_max[0])} {format_float(sim_min[1])} {format_float(sim_max[1])} {format_float(sim_min[2])} {format_float(sim_max[2])} units box\n")
-        file.write("create_box 1 domain\n\n")
-
-        file.write("#----------MATERIAL PROPERTIES----------#\n")
-        file.write("fix m1 all property/global youngsModulus peratomtype $E\n")
-        file.write("fix m2 all property/global poissonsRatio peratomtype $v\n")
-        file.write("fix m3 all property/global coefficientRestitution peratomtypepair 1 0.9\n")
-        file.write("fix m4 all property/global coefficientFriction peratomtypepair 1 $f\n")
-        file.write("fix m5 all property/global characteristicVelocity scalar 1.0\n")
-        file.write("fix m6 all property/global cohesionEnergyDensity peratomtypepair 1 $c\n\n")
-
-        file.write("#----------PARTICLE INSERTION----------#\n")
-        file.write("fix pts1 all particletemplate/sphere 15485863 atom_type 1 density constant $d radius constant $r\n")
-        file.write("fix pdd1 all particledistribution/discrete 32452843 1 pts1 1.0\n")
-        file.write(f"region ins_tray block {format_float(ins_min[0])} {format_float(ins_max[0])} {format_float(ins_min[1])} {format_float(ins_max[1])} {format_float(ins_min[2])} {format_float(ins_max[2])} units box\n")
-        file.write("fix ins all insert/pack seed 86028157 distributiontemplate pdd1 insert_every 10000 overlapcheck yes all_in yes region ins_tray volumefraction_region 0.6\n\n")
-
-        file.write("#----------WALLS----------#\n")
-        file.write("fix simtray all mesh/surface file simtray.stl type 1\n")
-        file.write("fix cont all wall/gran model hertz tangential history mesh n_meshes 1 meshes simtray\n\n")
-
-        file.write("#----------FORCE MODEL----------#\n")
-        file.write("pair_style gran model hertz tangential history cohesion sjkr2 \n")
-        file.write("pair_coeff * *\n\n")
-
-        file.write("#----------ADDITIONAL SETTINGS----------#\n")
-        file.write("fix nsph all nve/sphere\n")
-        file.write("fix gravi all gravity 9.81 vector 0.0 0.0 -1.0\n")
-        file.write("timestep $s\n\n")
-
-        file.write("#----------COMPUTATION----------#\n")
-        file.write("compute rke all erotate/sphere\n")
-        file.write("compute mudisp all displace/atom\n\n")
-
-        file.write("#----------DUMP FILES----------#\n")
-        file.write("#dump dmp all custom $e post/dump*.txt id x y z radius\n")
-
-        file.write("#----------RUN SPECIFICS----------#\n")
-        file.write("run 200000\n")
-        file.write("unfix ins\n\n")
-
-        file.write("write_restart restart.res\n")
-
-def write_run_file(filepath, simulation_params, moving_objects):
-    """Write the run.liggghts file with motion, rotation, and deformable logic."""
-    with open(filepath, "w") as file:
-        file.write("# This LIGGGHTS input file was autoGenerated using Blender->LIGGGHTS Addon\n\n")
-
-        file.write("#----------SET UP FOLDER FOR OUTPUT----------#\n")
-        file.write("shell mkdir post\n\n")
-
-        file.write("#----------SYSTEM VARIABLES----------#\n")
-        file.write(f"variable r equal {format_float(simulation_params['radius'])}\n")
-        file.write(f"variable E equal {format_float(simulation_params['youngs_modulus'])}\n")
-        file.write("variable f equal 0.8\n")
-        file.write(f"variable c equal {format_float(simulation_params['cohesion'])}\n")
-        file.write("variable d equal 1200\n")
-        file.write(f"variable v equal {format_float(simulation_params['poisson_ratio'])}\n")
-        file.write(f"variable s equal {simulation_params['timestep']:.6e}\n")
-        file.write("variable e equal 4000\n\n")
-
-        file.write("#----------SIMULATION SETTINGS----------#\n")
-        file.write("units si\n")
-        file.write("atom_style granular\n")
-        file.write("boundary f f f\n")
-        file.write("newton off\n")
-        file.write("communicate single vel yes\n")
-        file.write("neighbor $r bin\n")
-        file.write("neigh_modify every 1 delay 0 check yes\n\n")
-
-        file.write("#----------READ THE RESTART FILE----------#\n")
-        file.write("read_restart restart.res\n\n")
-
-        file.write("#----------MATERIAL PROPERTIES----------#\n")
-        file.write("fix m1 all property/global youngsModulus peratomtype $E\n")
-        file.write("fix m2 all property/global poissonsRatio peratomtype $v\n")
-        file.write("fix m3 all property/global coefficientRestitution peratomtypepair 1 0.1\n")
-        file.write("fix m4 all property/global coefficientFriction peratomtypepair 1 $f\n")
-        file.write("fix m5 all property/global characteristicVelocity scalar 1.0\n")
-        file.write("fix m6 all property/global cohesionEnergyDensity peratomtypepair 1 $c\n\n")
-
-        file.write("#----------FORCE MODEL----------#\n")
-        file.write("pair_style gran model hertz tangential history cohesion sjkr2\n")
-        file.write("pair_coeff * *\n\n")
-
-        file.write("#----------ADDITIONAL SETTINGS----------#\n")
-        file.write("fix nsph all nve/sphere\n")
-        file.write("fix gravi all gravity 9.81 vector 0.0 0.0 -1.0\n")
-        file.write("timestep $s\n\n")
-
-        file.write("#--------INITIALIZATION OF MESHES-----#\n")
-        file.write("fix tray all mesh/surface file simtray.stl type 1\n")
-
-        for obj in moving_objects:
-            if simulation_params['deformable']:
-                file.write(f"fix {obj.name} all mesh/surface file {obj.name}_1.stl type 1 curvature_tolerant yes\n")
-            else:
-                file.write(f"fix {obj.name} all mesh/surface file {obj.name}.stl type 1 curvature_tolerant yes\n")
-
-        file.write("fix cont1 all wall/gran model hertz tangential history mesh n_meshes {count} meshes tray ".format(count=len(moving_objects) + 1))
-        for obj in moving_objects:
-            file.write(f" {obj.name}")
-        file.write("\n\n")
-
-        file.write("#--------COMPUTATION----------#\n")
-        file.write("compute rke all erotate/sphere\n")
-        file.write("compute mudisp all displace/atom\n")
-        if not simulation_params['deformable']:
-            file.write("compute fc all wall/gran/local id pos force\n\n")
-
-        file.write("#----------DUMP FILES----------#\n")
-        file.write("dump dmp all custom $e post/dump*.txt id x y z radius\n")
-        file.write("dump dumpstl1 all mesh/vtk $e post/footcomp2_*.vtk id")
-        for obj in moving_objects:
-            file.write(f" {obj.name}")
-        file.write("\n\n")
-
-        file.write("run 4000\n\n")
-
+    return drain(iter_write_setup_file(filepath, simulation_params, sim_min, sim_max, ins_min, ins_max))
+
+def iter_write_setup_file(filepath, simulation_params, sim_min, sim_max, ins_min, ins_max):
+    """Write the setup.liggghts file, yielding (lines written, None) after each chunk; see iter_write_commands."""
+    return (yield from iter_write_commands(filepath, setup_commands(simulation_params, sim_min, sim_max, ins_min, ins_max)))
+
+def deformable_swap_commands(simulation_params, moving_objects, deformable_manifest, frame_start, frame_end):
+    """Yield per-frame mesh swaps, emitting one only when an object's STL actually changes."""
+    yield Comment("Deformable mesh logic")
+    frames = deformable_manifest["frames"]
+    current_files = {obj.name: frames[obj.name][frame_start] for obj in moving_objects}
+
+    for frame in range(frame_start + 1, frame_end + 1):
+        changed = [obj for obj in moving_objects if frames[obj.name][frame] != current_files[obj.name]]
+        if changed:
+            yield Undump("dumpstl1")
+            yield Unfix("cont1")
+            for obj in changed:
+                current_files[obj.name] = frames[obj.name][frame]
+                yield Unfix(obj.name)
+                yield mesh_surface_command(obj.name, current_files[obj.name])
+            yield moving_wall_fix_command(moving_objects)
+            yield mesh_dump_command(moving_objects)
+        yield Run(simulation_params['timesteps_per_frame'])
+
+def motion_velocities(simulation_params, world_matrices):
+    """Return the per-frame origins, linear and angular velocities of the moving objects, with noise zeroed."""
+    return frame_motion(world_matrices, simulation_params['frame_rate'],
+                        simulation_params['linear_epsilon'], simulation_params['angular_epsilon'])
+
+def motion_segment_commands(simulation_params, moving_objects, world_matrices, frame_start):
+    """Yield move/mesh fixes for each object's compressed motion segments.
+
+    Each object keeps its fixes for the whole of its own segment, so a run
+    only breaks where at least one object's motion changes. As in the
+    tabulated mode, rotations act about the segment's starting origin held
+    fixed in space, and the linear velocity is the one that carries the
+    sampled motion about it; see pivot_velocity_terms. Without moving
+    objects the frames still run.
+    """
+    yield Comment("Motion and rotation logic")
+    with span("motion maths"):
+        origins, linear, angular = motion_velocities(simulation_params, world_matrices)
+        segments = compress_motion(linear, angular, simulation_params['linear_tolerance'], simulation_params['angular_tolerance'],
+                                   origins, simulation_params['frame_rate'])
+
+    starts = {}
+    ends = {}
+    for index, object_segments in enumerate(segments):
+        for start, stop in object_segments:
+            starts.setdefault(start, []).append((index, start, stop))
+            ends.setdefault(stop, []).append((index, start))
+    boundaries = sorted(set(starts) | set(ends))
+    if not boundaries:
+        yield Run(len(linear) * simulation_params['timesteps_per_frame'])
+        return
+
+    written = {}
+    for begin, finish in zip(boundaries, boundaries[1:]):
+        for index, start, stop in starts.get(begin, []):
+            name = moving_objects[index].name
+            frame = frame_start + 1 + start
+            origin = origins[start, index]
+            # Each step's velocity about the fixed origin is within tolerance of the first, so the mean keeps the total displacement
+            velocity = pivot_velocities(origins[start:stop, index], linear[start:stop, index], angular[start:stop, index],
+                                        simulation_params['frame_rate'], origin).mean(axis=0)
+            axis, period = rotation_axes_periods(angular[start:stop, index].mean(axis=0))
+
+            rotate = np.isfinite(period)
+            if rotate:
+                yield Fix(f"rotate_{name}_{frame}", "all", "move/mesh", f"mesh {name} rotate origin {format_float(origin[0])} {format_float(origin[1])} {format_float(origin[2])} axis {format_float(axis[0])} {format_float(axis[1])} {format_float(axis[2])} period {format_float(period)}")
+
+            move = np.linalg.norm(velocity) > 0
+            if move:
+                yield Fix(f"move_{name}_{frame}", "all", "move/mesh", f"mesh {name} linear {format_float(velocity[0])} {format_float(velocity[1])} {format_float(velocity[2])}")
+            written[(index, start)] = (rotate, move)
+
+        yield Run((finish - begin) * simulation_params['timesteps_per_frame'])
+
+        for index, start in ends.get(finish, []):
+            name = moving_objects[index].name
+            frame = frame_start + 1 + start
+            rotate, move = written.pop((index, start))
+            if move:
+                yield Unfix(f"move_{name}_{frame}")
+            if rotate:
+                yield Unfix(f"rotate_{name}_{frame}")
+
+MOTION_COMPONENTS = ("vx", "vy", "vz", "wx", "wy", "wz")
+
+def uses_motion_loop(simulation_params, moving_objects, world_matrices):
+    """Return whether the run script drives the moving meshes with the tabulated motion loop."""
+    return (not simulation_params['deformable'] and simulation_params['motion_mode'] == 'TABULATED'
+            and bool(moving_objects) and len(world_matrices) > 1)
+
+def tabulated_motion_commands(simulation_params, moving_objects, world_matrices, output_dir, staged=None):
+    """Yield persistent variable-velocity fixes that read each moving mesh's per-frame tables.
+
+    The per-frame velocities are written to motion/<object>_<component>.txt
+    and a label/jump loop advances the file-style variables once per frame,
+    so the script length does not depend on the number of frames. With no
+    moving objects the frames run as one plain run. When a staged list is
+    given, the tables are written to .partial files and their (partial,
+    final) paths appended to it, for the caller to rename with the script.
+    """
+    yield Comment("Tabulated motion logic")
+    with span("motion maths"):
+        origins, linear, angular = motion_velocities(simulation_params, world_matrices)
+    step_count = len(linear)
+    if step_count == 0:
+        return
+    if not moving_objects:
+        # Without tables to advance, next would be an illegal empty command
+        yield Run(step_count * simulation_params['timesteps_per_frame'])
+        return
+
+    motion_dir = os.path.join(output_dir, "motion")
+    if not os.path.exists(motion_dir):
+        os.makedirs(motion_dir)
+
+    table_variables = []
+    for index, obj in enumerate(moving_objects):
+        name = obj.name
+        # Rotations act about a fixed origin, so each frame's linear velocity is the one that carries it about that origin
+        origin = origins[0, index]
+        velocity = pivot_velocities(origins[:, index], linear[:, index], angular[:, index], simulation_params['frame_rate'], origin)
+        table = np.hstack((velocity, angular[:, index]))
+
+        for column, component in enumerate(MOTION_COMPONENTS):
+            table_path = os.path.join(motion_dir, f"{name}_{component}.txt")
+            if staged is not None:
+                staged.append((table_path + PARTIAL_SUFFIX, table_path))
+                table_path = staged[-1][0]
+            with span("motion tables"):
+                np.savetxt(table_path, table[:, column], fmt="%.9e")
+            yield Variable(f"{name}_{component}_tab", "file", f"motion/{name}_{component}.txt")
+            yield Variable(f"{name}_{component}", "equal", f"v_{name}_{component}_tab")
+            table_variables.append(f"{name}_{component}_tab")
+
+        for axis, component in zip(("1 0 0", "0 1 0", "0 0 1"), ("wx", "wy", "wz")):
+            yield Fix(f"rotate_{name}_{component}", "all", "move/mesh", f"mesh {name} rotate/variable origin {format_float(origin[0])} {format_float(origin[1])} {format_float(origin[2])} axis {axis} omega v_{name}_{component}")
+        yield Fix(f"move_{name}", "all", "move/mesh", f"mesh {name} linear/variable v_{name}_vx v_{name}_vy v_{name}_vz")
+
+    yield Variable("motion_frame", "loop", str(step_count))
+    yield Command("label", "motion_loop")
+    yield Run(simulation_params['timesteps_per_frame'])
+    yield Command("next", " ".join(table_variables))
+    yield Command("next", "motion_frame")
+    yield Command("jump", "SELF motion_loop")
+
+    for obj in moving_objects:
+        yield Unfix(f"move_{obj.name}")
+        for component in ("wx", "wy", "wz"):
+            yield Unfix(f"rotate_{obj.name}_{component}")
+
+def run_commands(simulation_params, moving_objects, output_dir, frame_start, frame_end, deformable_manifest=None, world_matrices=None, staged=None):
+    """Yield the commands of the run.liggghts script."""
+    yield Comment("This LIGGGHTS input file was autoGenerated using Blender->LIGGGHTS Addon")
+    if uses_motion_loop(simulation_params, moving_objects, world_matrices):
+        # jump SELF rereads the script file, which is not possible when it comes in on stdin
+        yield Comment("The motion loop jumps within this file: run it as lmp -in run.liggghts, not lmp < run.liggghts")
+    yield Blank()
+
+    yield Section("SET UP FOLDER FOR OUTPUT")
+    yield Command("shell", "mkdir post")
+    yield Blank()
+
+    yield from system_variable_commands(simulation_params)
+    yield Variable("e", "equal", str(simulation_params['dump']['every']))
+    # Recorded for the dump importers: frame k of the animation starts at warmup_steps + k * frame_steps
+    yield Variable("warmup_steps", "equal", str(warmup_steps(simulation_params['timesteps_per_frame'])))
+    yield Variable("frame_steps", "equal", str(simulation_params['timesteps_per_frame']))
+    yield Blank()
+
+    yield from simulation_settings_commands()
+    yield from processor_commands(simulation_params.get('processor_plan'))
+
+    yield Section("READ THE RESTART FILE")
+    yield Command("read_restart", "restart.res")
+    # Count from 0 rather than the restart's arbitrary settled step, so dumps fall on frame boundaries
+    yield Command("reset_timestep", "0")
+    yield Blank()
+
+    yield from balance_commands(simulation_params.get('processor_plan'), rebalance_now=True)
+
+    yield from material_commands(0.1)
+    yield from force_model_commands()
+    yield from integration_commands()
+
+    yield Section("INITIALIZATION OF MESHES")
+    yield Fix("tray", "all", "mesh/surface", "file simtray.stl type 1")
+    for obj in moving_objects:
         if simulation_params['deformable']:
-            file.write("# Deformable mesh logic\n")
-            file.write("undump dumpstl1\n")
-            file.write("unfix cont1\n")
-            for obj in moving_objects:
-                file.write(f"unfix {obj.name}\n")
-                file.write(f"fix {obj.name} all mesh/surface file {obj.name}_2.stl type 1 curvature_tolerant yes\n")
-            file.write("fix cont1 all wall/gran model hertz tangential history mesh n_meshes {count} meshes tray ".format(count=len(moving_objects) + 1))
-            for obj in moving_objects:
-                file.write(f" {obj.name}")
-            file.write("\n")
-            file.write("dump dumpstl1 all mesh/vtk $e post/footcomp2_*.vtk id")
-            for obj in moving_objects:
-                file.write(f" {obj.name}")
-            file.write("\n\n")
-
-        file.write("# Motion and rotation logic\n")
-        scene = bpy.context.scene
-        frame_start = scene.frame_start
-        frame_end = scene.frame_end
-
-        rotate_written = {}
-        move_written = {}
-        
-        # Initialize previous state at frame_start for quaternion continuity
-        prev_quats = {}
-        prev_locations = {}
-        scene.frame_set(frame_start)
-        for obj in moving_objects:
-            prev_quats[obj.name] = obj.matrix_world.to_quaternion()
-            prev_locations[obj.name] = obj.matrix_world.translation.copy()
-        
-        for frame in range(frame_start + 1, frame_end + 1):
-            scene.frame_set(frame)
-            for obj in moving_objects:
-                prev_location = prev_locations[obj.name]
-                prev_rotation_quat = prev_quats[obj.name]
-
-                curr_location = obj.matrix_world.translation.copy()
-                curr_rotation_quat = obj.matrix_world.to_quaternion()
-                
-                # Ensure quaternion continuity - flip if in opposite hemisphere
-                # This prevents spurious 180-degree axis flips when q and -q represent the same rotation
-                if prev_rotation_quat.dot(curr_rotation_quat) < 0:
-                    curr_rotation_quat.negate()
-
-                translation = curr_location - prev_location
-
-                # This matches Maya's: quat1.inverse() * quat2
-                rotation_diff_quat = curr_rotation_quat @ prev_rotation_quat.inverted()
-
-                axis, angle = rotation_diff_quat.to_axis_angle()
-
-                if angle > 0:
-                    period = 360 / (math.degrees(angle) * simulation_params['frame_rate'])
-                    file.write(f"fix rotate_{obj.name}_{frame} all move/mesh mesh {obj.name} rotate origin {format_float(prev_location.x)} {format_float(prev_location.y)} {format_float(prev_location.z)} axis {format_float(axis.x)} {format_float(axis.y)} {format_float(axis.z)} period {format_float(period)}\n")
-                    rotate_written[(obj.name, frame)] = True
-                else:
-                    rotate_written[(obj.name, frame)] = False
-
-                if translation.length > 0:
-                    file.write(f"fix move_{obj.name}_{frame} all move/mesh mesh {obj.name} linear {format_float(translation.x * simulation_params['frame_rate'])} {format_float(translation.y * simulation_params['frame_rate'])} {format_float(translation.z * simulation_params['frame_rate'])}\n")
-                    move_written[(obj.name, frame)] = True
-                else:
-                    move_written[(obj.name, frame)] = False
-
-                # Store current state for next frame's continuity check
-                prev_quats[obj.name] = curr_rotation_quat.copy()
-                prev_locations[obj.name] = curr_location.copy()
-
-            file.write(f"run {simulation_params['timesteps_per_frame']}\n")
-
-            for obj in moving_objects:
-                if move_written.get((obj.name, frame), False):
-                    file.write(f"unfix move_{obj.name}_{frame}\n")
-                if rotate_written.get((obj.name, frame), False):
-                    file.write(f"unfix rotate_{obj.name}_{frame}\n")
\ No newline at end of file
+            mesh_file = deformable_manifest["frames"][obj.name][frame_start]
+        else:
+            mesh_file = f"{obj.name}.stl"
+        yield mesh_surface_command(obj.name, mesh_file)
+    yield moving_wall_fix_command(moving_objects)
+    yield Blank()
+
+    yield Section("COMPUTATION")
+    yield Command("compute", "rke all erotate/sphere")
+    yield Command("compute", "mudisp all displace/atom")
+    if not simulation_params['deformable']:
+        yield Command("compute", "fc all wall/gran/local id pos force")
+    yield Blank()
+
+    yield Section("DUMP FILES")
+    yield from dump_commands(simulation_params['dump'], moving_objects)
+    if not simulation_params['deformable'] and simulation_params['dump']['force_every']:
+        yield force_dump_command(simulation_params['dump']['force_every'])
+    yield Blank()
+
+    yield Run(warmup_steps(simulation_params['timesteps_per_frame']))
+    yield Blank()
+
+    if simulation_params['deformable']:
+        # Frames without a mesh swap collapse into one longer run
+        yield from merge_runs(deformable_swap_commands(simulation_params, moving_objects, deformable_manifest, frame_start, frame_end))
+    elif simulation_params['motion_mode'] == 'TABULATED':
+        yield from tabulated_motion_commands(simulation_params, moving_objects, world_matrices, output_dir, staged)
+    else:
+        yield from motion_segment_commands(simulation_params, moving_objects, world_matrices, frame_start)
+
+def write_run_file(filepath, simulation_params, moving_objects, deformable_manifest=None, world_matrices=None):
+    """Write the run.liggghts file with motion, rotation, and deformable logic.
+
+    world_matrices holds the moving objects' sampled transforms with shape
+    (frames, objects, 4, 4); they are sampled here when not given.
+    """
+    return drain(iter_write_run_file(filepath, simulation_params, moving_objects, deformable_manifest, world_matrices))
+
+def iter_write_run_file(filepath, simulation_params, moving_objects, deformable_manifest=None, world_matrices=None, staged=None):
+    """Write the run.liggghts file, yielding (lines written, None) after each chunk; see write_run_file.
+
+    Files the script reads, such as motion tables, are staged as in
+    tabulated_motion_commands when a staged list is given.
+    """
+    scene = bpy.context.scene
+    if world_matrices is None and not simulation_params['deformable']:
+        world_matrices = sample_world_matrices(scene, moving_objects, scene.frame_start, scene.frame_end)
+    commands = run_commands(simulation_params, moving_objects, os.path.dirname(filepath), scene.frame_start, scene.frame_end, deformable_manifest, world_matrices, staged)
+    return (yield from iter_write_commands(filepath, commands))
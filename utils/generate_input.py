@@ -1,84 +1,487 @@
 import os
+import time
 import bpy
 from mathutils import Vector
-from .mesh_utils import export_rigid_stls, export_deformable_stls
-from .file_writer import write_setup_file, write_run_file
+from .mesh_utils import export_stl, geometry_digest, iter_deformable_stls, iter_deformable_stls_parallel
+from .deformable_cache import (DEFORMABLE_MANIFEST, iter_deformable_extent, materialize_stl, open_position_cache,
+                               read_deformable_manifest)
+from .contact_forces import FORCE_COLUMNS
+from .cost import (describe_cost, describe_dump_size, dump_count, estimate_cost, estimate_dump_size, estimate_force_dump_size,
+                   wall_contact_count)
+from .domain import (clipped_axes, describe_plan, estimate_particle_count, overlap_fraction, pad_bounds, plan_processors,
+                     rigid_swept_bounds, settled_bed_bounds, union_bounds)
+from .export_manifest import inputs_digest, is_current, read_export_manifest, script_sources_digest, write_export_manifest
+from .file_writer import (PARTIAL_SUFFIX, dump_field_names, format_bounds, iter_write_run_file, iter_write_setup_file, run_steps,
+                          simulation_steps)
+from .profiling import CPROFILE_FILE, PROFILE_FILE, Profile, active, finish_profile, phase, summarize
+from .restart_cache import prepare_restart, restart_available, settle_fingerprint
+from .timestep import compute_stable_timestep, describe_timestep, free_fall_speed, rigid_max_speed
+from .steps import relay
+from .transform_sampling import iter_sample_world_matrices
 
-def generate_input_files(context, output_dir, deformable):
-    """Generate LIGGGHTS input files for rigid or deformable meshes."""
+TICK_SECONDS = 0.02  # interval of the modal operator's timer
+SLICE_SECONDS = 0.1  # work done per timer tick before handing control back to the UI
+
+def calculate_world_bounds(obj):
+    """Return the world-space min and max corners of obj's bounding box."""
+    world_coords = [obj.matrix_world @ Vector(corner) for corner in obj.bound_box]
+    min_coords = Vector((min(v.x for v in world_coords), min(v.y for v in world_coords), min(v.z for v in world_coords)))
+    max_coords = Vector((max(v.x for v in world_coords), max(v.y for v in world_coords), max(v.z for v in world_coords)))
+    return min_coords, max_coords
+
+def scene_stable_timestep(scene, object_speed, sim_min, ins_max):
+    """Compute the stable timestep for the scene's material parameters and frame rate.
+
+    The collision velocity is the faster of the moving objects' peak speed
+    and the impact speed of particles dropped from the top of the insertion
+    volume onto the tray (or the bottom of the domain).
+    """
+    floor_z = calculate_world_bounds(scene.liggghts_tray)[0].z if scene.liggghts_tray else sim_min.z
+    collision_velocity = max(object_speed, free_fall_speed(ins_max.z - floor_z))
+    return compute_stable_timestep(
+        scene.liggghts_radius, scene.liggghts_density, scene.liggghts_youngs_modulus,
+        scene.liggghts_poisson_ratio, collision_velocity, scene.liggghts_framerate,
+        scene.liggghts_timestep_safety)
+
+def scene_swept_bounds(scene, moving_bounds=None):
+    """Return the box enclosing the tray, the insertion volume and, when given, the moving objects' swept box."""
+    boxes = [calculate_world_bounds(scene.liggghts_insertion_volume)]
+    if scene.liggghts_tray:
+        boxes.append(calculate_world_bounds(scene.liggghts_tray))
+    if moving_bounds is not None:
+        boxes.append(moving_bounds)
+    return union_bounds(boxes)
+
+def scene_bed_bounds(scene, sim_min, sim_max, ins_min, ins_max):
+    """Estimate the box the settled particles occupy, resting on the tray when there is one."""
+    floor_z = calculate_world_bounds(scene.liggghts_tray)[0].z if scene.liggghts_tray else None
+    return settled_bed_bounds(sim_min, sim_max, ins_min, ins_max, floor_z)
+
+def scene_dump_settings(scene, timesteps_per_frame, region=None):
+    """Return the run script's dump settings: cadence in timesteps, format, fields and optional (min, max) region.
+
+    force_every is the cadence of the rigid runs' contact force dump, 0 when it is off.
+    """
+    return {
+        "every": scene.liggghts_dump_every_frames * timesteps_per_frame,
+        "format": scene.liggghts_dump_format,
+        "fields": dump_field_names(scene.liggghts_dump_fields),
+        "region": region,
+        "force_every": scene.liggghts_force_dump_every_frames * timesteps_per_frame if scene.liggghts_force_dump else 0,
+    }
+
+def scene_processor_plan(scene, sim_min, sim_max, ins_min, ins_max):
+    """Estimate the particle count and, for more than one MPI rank, plan the processors grid."""
+    particle_count = estimate_particle_count(ins_min, ins_max, scene.liggghts_radius)
+    if scene.liggghts_mpi_ranks <= 1:
+        return particle_count, None
+    bed_min, bed_max = scene_bed_bounds(scene, sim_min, sim_max, ins_min, ins_max)
+    return particle_count, plan_processors(scene.liggghts_mpi_ranks, sim_min, sim_max, bed_min, bed_max, particle_count)
+
+def scene_cost_estimate(scene, timesteps_per_frame=None, sim_bounds=None, dump_region=None, deformable=False):
+    """Estimate the memory, runtime and dump output of the scene's simulation before generating it.
+
+    Without timesteps_per_frame the manual timestep is used, or with Auto
+    Timestep the free-fall-only stable timestep, which is a lower bound on
+    the cost. sim_bounds overrides the simulation volume's bounds. The
+    dump output assumes every particle is dumped unless dump_region is
+    given, in which case only the share of the settled bed inside it is.
+    The contact force dump, which only rigid runs write, is counted with
+    one contact per particle of the bed's bottom layer.
+    """
+    sim_min, sim_max = sim_bounds or calculate_world_bounds(scene.liggghts_simulation_volume)
+    ins_min, ins_max = calculate_world_bounds(scene.liggghts_insertion_volume)
+    if timesteps_per_frame is None:
+        if scene.liggghts_auto_timestep:
+            timesteps_per_frame = scene_stable_timestep(scene, 0.0, sim_min, ins_max)["timesteps_per_frame"]
+        else:
+            timesteps_per_frame = round(1 / scene.liggghts_framerate / scene.liggghts_timestep)
+    particle_count, processor_plan = scene_processor_plan(scene, sim_min, sim_max, ins_min, ins_max)
+    mesh_triangles = scene.liggghts_tray_triangles_decimated + sum(item.triangles_decimated for item in scene.liggghts_moving_objects)
+    frame_count = scene.frame_end - scene.frame_start + 1
+    total_steps = simulation_steps(timesteps_per_frame, frame_count, scene.liggghts_settle_max_steps)
+    cost = estimate_cost(particle_count, total_steps, scene.liggghts_radius, sim_min, sim_max, processor_plan, mesh_triangles)
+
+    dump = scene_dump_settings(scene, timesteps_per_frame, dump_region)
+    bed_bounds = scene_bed_bounds(scene, sim_min, sim_max, ins_min, ins_max)
+    particle_fraction = 1.0
+    if dump_region is not None:
+        particle_fraction = overlap_fraction(*bed_bounds, *dump_region)
+    steps = run_steps(timesteps_per_frame, frame_count)
+    cost["dumps"] = dump_count(steps, dump["every"])
+    cost["dump_bytes"] = estimate_dump_size(particle_count, cost["dumps"], len(dump["fields"]), dump["format"], particle_fraction,
+                                            sum(item.triangles_decimated for item in scene.liggghts_moving_objects))
+    cost["force_dumps"] = dump_count(steps, dump["force_every"]) if dump["force_every"] and not deformable else 0
+    contacts = wall_contact_count(*bed_bounds, scene.liggghts_radius)
+    cost["dump_bytes"] += estimate_force_dump_size(contacts, cost["force_dumps"], len(FORCE_COLUMNS))
+    return cost
+
+def reusable_deformable_manifest(output_dir, objects, frame_start, frame_end, tolerance=0.0):
+    """Return the deformable manifest in output_dir if it covers these objects and frames at this tolerance, else None."""
+    manifest_path = os.path.join(output_dir, DEFORMABLE_MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    manifest = read_deformable_manifest(manifest_path)
+    if manifest["frame_start"] != frame_start or manifest["frame_end"] != frame_end:
+        return None
+    if set(manifest["frames"]) != {obj.name for obj in objects}:
+        return None
+    # Unique frames found with another tolerance would swap meshes at different frames
+    if manifest.get("tolerance", 0.0) != tolerance:
+        return None
+    return manifest
+
+def generate_input_files(context, output_dir, deformable, reuse_deformable_cache=False):
+    """Generate LIGGGHTS input files for rigid or deformable meshes in one call.
+
+    With reuse_deformable_cache, a deformable cache already in output_dir
+    for the same objects and frame range is used instead of evaluating the
+    sequence again. Returns the messages to report.
+    """
+    messages = []
+    window_manager = context.window_manager
+    window_manager.progress_begin(0.0, 1.0)
+    try:
+        for fraction, _ in profiled_generation(context, output_dir, deformable, messages, reuse_deformable_cache):
+            window_manager.progress_update(fraction)
+    finally:
+        window_manager.progress_end()
+    return messages
+
+def profiled_generation(context, output_dir, deformable, messages, reuse_deformable_cache=False):
+    """Step through generation_steps, profiling only the time spent inside the steps.
+
+    The profile goes to liggghts_profile.json, and to cProfile statistics
+    when the scene asks for them, whether the steps finish or are
+    cancelled; its summary is appended to messages on completion.
+    """
+    cprofile_path = os.path.join(output_dir, CPROFILE_FILE) if context.scene.liggghts_cprofile else None
+    profile = Profile(cprofile=bool(cprofile_path))
+    steps = generation_steps(context, output_dir, deformable, messages, reuse_deformable_cache)
+    try:
+        while True:
+            with active(profile):
+                try:
+                    progress = next(steps)
+                except StopIteration:
+                    break
+            yield progress
+    finally:
+        with active(profile):
+            steps.close()
+        finish_profile(profile, os.path.join(output_dir, PROFILE_FILE), cprofile_path)
+    messages.append(summarize(profile))
+
+def restore_start_frame(scene):
+    """Return the scene to its first frame if the timeline was moved since the last generation step."""
+    if scene.frame_current != scene.frame_start:
+        scene.frame_set(scene.frame_start)
+
+def generation_steps(context, output_dir, deformable, messages, reuse_deformable_cache=False):
+    """Export the meshes and write the scripts, yielding (fraction done, status) after each bounded unit of work.
+
+    Closing the generator cancels the export between units. Every file
+    written up to then is complete and recorded in the export manifest;
+    the scripts and the motion tables they read are written to .partial
+    files, the scripts in batches of lines, and the restart is only
+    prepared and the staged files renamed into place, together, once all
+    are complete, so a cancelled run leaves the previous scripts, tables
+    and restart untouched.
+    """
     scene = context.scene
+    os.makedirs(output_dir, exist_ok=True)
 
     #we need to set the frame to the beggining of the animation here
     bpy.context.scene.frame_set(scene.frame_start)
+    # The timeline stays usable between steps, so every evaluation below returns to the first frame again
 
     # Export moving objects as STL files
+    phase("export moving objects")
     moving_objects = [bpy.data.objects[item.name] for item in scene.liggghts_moving_objects]
-    if deformable:
-        frame_start = scene.frame_start
-        frame_end = scene.frame_end
-        export_deformable_stls(output_dir, moving_objects, frame_start, frame_end)
-    else:
-        export_rigid_stls(output_dir, moving_objects)
-
-    # Export tray as STL
-    if scene.liggghts_tray:
-        tray_filepath = os.path.join(output_dir, "simtray.stl")
-        bpy.ops.object.select_all(action='DESELECT')
-        scene.liggghts_tray.select_set(True)
-        bpy.context.view_layer.objects.active = scene.liggghts_tray
-        bpy.ops.wm.stl_export(filepath=tray_filepath, export_selected_objects=True, ascii_format=True)
-
-    # Calculate frame rate and timesteps per frame
-    frame_rate = scene.liggghts_framerate
-    frame_duration = 1 / frame_rate
-    timesteps_per_frame = round(frame_duration / scene.liggghts_timestep)
-
-    # Set up simulation parameters
-    setup_filepath = os.path.join(output_dir, "setup.liggghts")
-    run_filepath = os.path.join(output_dir, "run.liggghts")
-
-    simulation_params = {
-        "radius": scene.liggghts_radius,
-        "timestep": scene.liggghts_timestep,
-        "youngs_modulus": scene.liggghts_youngs_modulus,
-        "cohesion": scene.liggghts_cohesion,
-        "poisson_ratio": scene.liggghts_poisson_ratio,
-        "frame_rate": frame_rate,
-        "timesteps_per_frame": timesteps_per_frame,
-        "deformable": deformable
-    }
+    ascii_format = scene.liggghts_stl_ascii
+    deformable_manifest = None
+    # Deformable sequences are never decimated, which would change their topology from frame to frame
+    edge_length = scene.liggghts_decimate_edge_factor * scene.liggghts_radius if scene.liggghts_decimate else None
+    # Only meshes and scripts whose inputs changed since the last export are rewritten
+    manifest = read_export_manifest(output_dir, {"ascii_format": ascii_format, "edge_length": edge_length})
+    meshes = manifest["meshes"]
+    staged = []
+    try:
+        depsgraph = context.evaluated_depsgraph_get()
+        if deformable:
+            frame_start = scene.frame_start
+            frame_end = scene.frame_end
+            tolerance = scene.liggghts_deformable_tolerance
+            if reuse_deformable_cache:
+                deformable_manifest = reusable_deformable_manifest(output_dir, moving_objects, frame_start, frame_end, tolerance)
+            if deformable_manifest is None and scene.liggghts_export_workers > 1:
+                steps = iter_deformable_stls_parallel(output_dir, moving_objects, frame_start, frame_end, scene.liggghts_export_workers,
+                                                      tolerance)
+                deformable_manifest = yield from relay(steps, "Caching frame", 0.0, 0.5)
+            elif deformable_manifest is None:
+                steps = iter_deformable_stls(output_dir, moving_objects, frame_start, frame_end, tolerance)
+                deformable_manifest = yield from relay(steps, "Caching frame", 0.0, 0.5)
+            # Only the unique frames the run script swaps to are written as STL files
+            topology_digests = {obj.name: inputs_digest(open_position_cache(output_dir, obj.name)[0]) for obj in moving_objects}
+            unique = deformable_manifest["unique"]
+            digests = {filename: inputs_digest(source["digest"], topology_digests[source["object"]]) for filename, source in unique.items()}
+            changed = [filename for filename in unique
+                       if not is_current(manifest["deformable"], filename, digests[filename], os.path.join(output_dir, filename))]
+            for done, filename in enumerate(changed, 1):
+                materialize_stl(output_dir, filename, ascii_format, deformable_manifest, overwrite=True)
+                manifest["deformable"][filename] = {"digest": digests[filename]}
+                yield 0.5 + 0.2 * done / len(changed), f"Writing deformable STL {done}/{len(changed)}"
+            manifest["deformable"] = {filename: {"digest": digests[filename]} for filename in unique}
+            messages.append(f"Wrote {len(changed)} of {len(unique)} deformable STL files")
+        else:
+            # Digesting evaluates each mesh, so it gets a step per object too
+            digests = {}
+            for done, obj in enumerate(moving_objects, 1):
+                restore_start_frame(scene)
+                digests[obj.name] = geometry_digest(obj, depsgraph)
+                yield 0.1 * done / len(moving_objects), f"Checking {obj.name} ({done}/{len(moving_objects)})"
+            changed = [obj for obj in moving_objects
+                       if not is_current(meshes, f"{obj.name}.stl", digests[obj.name], os.path.join(output_dir, f"{obj.name}.stl"))]
+            for done, obj in enumerate(changed, 1):
+                restore_start_frame(scene)
+                counts = export_stl(os.path.join(output_dir, f"{obj.name}.stl"), [obj], ascii_format=ascii_format,
+                                    depsgraph=depsgraph, edge_length=edge_length)
+                meshes[f"{obj.name}.stl"] = {"digest": digests[obj.name], "triangles": list(counts)}
+                yield 0.1 + 0.6 * done / len(changed), f"Exporting {obj.name} ({done}/{len(changed)})"
+            for item in scene.liggghts_moving_objects:
+                item.triangles, item.triangles_decimated = meshes[f"{item.name}.stl"]["triangles"]
+            messages.append(f"Exported {len(changed)} of {len(moving_objects)} rigid STL files")
 
-    # Calculate world-space bounds for simulation and insertion volumes
-    def calculate_world_bounds(obj):
-        world_coords = [obj.matrix_world @ Vector(corner) for corner in obj.bound_box]
-        min_coords = Vector((min(v.x for v in world_coords), min(v.y for v in world_coords), min(v.z for v in world_coords)))
-        max_coords = Vector((max(v.x for v in world_coords), max(v.y for v in world_coords), max(v.z for v in world_coords)))
-        return min_coords, max_coords
+        # Export tray as STL
+        phase("export tray")
+        if scene.liggghts_tray:
+            yield 0.7, "Exporting the tray"
+            tray_filepath = os.path.join(output_dir, "simtray.stl")
+            restore_start_frame(scene)
+            digest = geometry_digest(scene.liggghts_tray, depsgraph)
+            if not is_current(meshes, "simtray.stl", digest, tray_filepath):
+                counts = export_stl(tray_filepath, [scene.liggghts_tray], ascii_format=ascii_format, edge_length=edge_length)
+                meshes["simtray.stl"] = {"digest": digest, "triangles": list(counts)}
+            scene.liggghts_tray_triangles, scene.liggghts_tray_triangles_decimated = meshes["simtray.stl"]["triangles"]
 
-    sim_min, sim_max = calculate_world_bounds(scene.liggghts_simulation_volume)
-    ins_min, ins_max = calculate_world_bounds(scene.liggghts_insertion_volume)
+        # Calculate world-space bounds for simulation and insertion volumes
+        sim_min, sim_max = calculate_world_bounds(scene.liggghts_simulation_volume)
+        ins_min, ins_max = calculate_world_bounds(scene.liggghts_insertion_volume)
+
+        phase("sample motion")
+        world_matrices = None
+        if not deformable:
+            steps = iter_sample_world_matrices(scene, moving_objects, scene.frame_start, scene.frame_end)
+            world_matrices = yield from relay(steps, "Sampling motion", 0.75, 0.85)
+
+        # Check the simulation volume against the swept volume, optionally shrinking the domain to it
+        yield 0.85, "Computing the swept volume"
+        phase("swept volume")
+        # The moving objects' swept box is computed once and shared by the domain, dump region and timestep;
+        # deformable sequences are scanned in chunks, taking their fastest vertex speed in the same pass
+        moving_bounds = None
+        object_speed = 0.0
+        if deformable:
+            steps = iter_deformable_extent(output_dir, deformable_manifest, scene.liggghts_framerate)
+            moving_bounds, object_speed = yield from relay(steps, "Scanning frames", 0.85, 0.9)
+        elif moving_objects:
+            moving_bounds = rigid_swept_bounds(world_matrices, [obj.bound_box for obj in moving_objects])
+        swept_min, swept_max = scene_swept_bounds(scene, moving_bounds if moving_objects else None)
+        clipped = clipped_axes(swept_min, swept_max, sim_min, sim_max)
+        if scene.liggghts_tight_domain:
+            padding = scene.liggghts_domain_padding * scene.liggghts_radius
+            sim_min, sim_max = (Vector(bounds) for bounds in pad_bounds(swept_min, swept_max, padding))
+            messages.append(f"Domain shrunk to the swept volume: {format_bounds(sim_min, sim_max)}")
+        if clipped:
+            messages.append(f"Warning: the simulation volume clips the tray, insertion volume or moving objects at {', '.join(clipped)}")
+        dump_region = None
+        if scene.liggghts_dump_near_objects and moving_objects:
+            moving_min, moving_max = moving_bounds
+            padding = scene.liggghts_dump_region_padding * scene.liggghts_radius
+            dump_region = tuple([float(value) for value in bounds] for bounds in pad_bounds(moving_min, moving_max, padding))
+
+        # Calculate frame rate and timesteps per frame
+        yield 0.9, "Choosing the timestep"
+        phase("timestep")
+        frame_rate = scene.liggghts_framerate
+        frame_duration = 1 / frame_rate
+        timestep = scene.liggghts_timestep
+        timesteps_per_frame = round(frame_duration / timestep)
+        if scene.liggghts_auto_timestep:
+            if not deformable:
+                object_speed = rigid_max_speed(world_matrices, frame_rate, [obj.bound_box for obj in moving_objects])
+            result = scene_stable_timestep(scene, object_speed, sim_min, ins_max)
+            timestep = result["timestep"]
+            timesteps_per_frame = result["timesteps_per_frame"]
+            messages.append(describe_timestep(result))
+
+        # Set up simulation parameters
+        setup_filepath = os.path.join(output_dir, "setup.liggghts")
+        run_filepath = os.path.join(output_dir, "run.liggghts")
+
+        simulation_params = {
+            "radius": scene.liggghts_radius,
+            "timestep": timestep,
+            "auto_timestep": scene.liggghts_auto_timestep,
+            "youngs_modulus": scene.liggghts_youngs_modulus,
+            "cohesion": scene.liggghts_cohesion,
+            "poisson_ratio": scene.liggghts_poisson_ratio,
+            "density": scene.liggghts_density,
+            "frame_rate": frame_rate,
+            "timesteps_per_frame": timesteps_per_frame,
+            "linear_tolerance": scene.liggghts_linear_tolerance,
+            "angular_tolerance": scene.liggghts_angular_tolerance,
+            "linear_epsilon": scene.liggghts_linear_epsilon,
+            "angular_epsilon": scene.liggghts_angular_epsilon,
+            "motion_mode": scene.liggghts_motion_mode,
+            "settle_max_steps": scene.liggghts_settle_max_steps,
+            "settle_block": scene.liggghts_settle_block,
+            "settle_speed": scene.liggghts_settle_speed if scene.liggghts_settle_early else 0.0,
+            "deformable": deformable,
+            "dump": scene_dump_settings(scene, timesteps_per_frame, dump_region),
+        }
+
+        phase("plan and cost")
+        _, processor_plan = scene_processor_plan(scene, sim_min, sim_max, ins_min, ins_max)
+        if processor_plan is not None:
+            simulation_params["processor_plan"] = processor_plan
+            messages.append(describe_plan(processor_plan))
+        cost = scene_cost_estimate(scene, timesteps_per_frame, (sim_min, sim_max), dump_region, deformable)
+        messages.append(describe_cost(cost))
+        messages.append(describe_dump_size(cost))
 
-    write_setup_file(setup_filepath, simulation_params, sim_min, sim_max, ins_min, ins_max)
-    write_run_file(run_filepath, simulation_params, moving_objects)
+        yield 0.93, "Checking the restart cache"
+
+        # Reuse a settled bed whose setup inputs have not changed; the restart
+        # files themselves are only touched once the scripts are complete
+        phase("restart cache")
+        tray_filepath = os.path.join(output_dir, "simtray.stl") if scene.liggghts_tray else None
+        fingerprint = settle_fingerprint(simulation_params, sim_min, sim_max, ins_min, ins_max, tray_filepath)
+        cache_dir = bpy.path.abspath(scene.liggghts_restart_cache_dir) if scene.liggghts_restart_cache_dir else ""
+        skippable = restart_available(output_dir, cache_dir, fingerprint)
+        simulation_params["restart"] = {"fingerprint": fingerprint, "cache_dir": cache_dir, "skippable": skippable}
+        if skippable:
+            messages.append("Settled bed reused from the restart cache: setup.liggghts can be skipped")
+
+        phase("setup script")
+        sources = script_sources_digest()
+        scripts = manifest["scripts"]
+        unchanged = []
+        written = {}
+        setup_digest = inputs_digest(sources, simulation_params, [list(sim_min), list(sim_max), list(ins_min), list(ins_max)])
+        if is_current(scripts, "setup.liggghts", setup_digest, setup_filepath):
+            unchanged.append("setup.liggghts")
+        else:
+            staged.append((setup_filepath + PARTIAL_SUFFIX, setup_filepath))
+            for lines, _ in iter_write_setup_file(staged[-1][0], simulation_params, sim_min, sim_max, ins_min, ins_max):
+                yield 0.95, f"Writing setup.liggghts ({lines} lines)"
+            written["setup.liggghts"] = {"digest": setup_digest}
+        phase("run script")
+        run_digest = inputs_digest(sources, simulation_params, [obj.name for obj in moving_objects], deformable_manifest, world_matrices)
+        if is_current(scripts, "run.liggghts", run_digest, run_filepath):
+            unchanged.append("run.liggghts")
+        else:
+            staged.append((run_filepath + PARTIAL_SUFFIX, run_filepath))
+            # Motion tables the script reads are staged alongside it and committed together
+            for lines, _ in iter_write_run_file(staged[-1][0], simulation_params, moving_objects, deformable_manifest, world_matrices, staged):
+                yield 0.97, f"Writing run.liggghts ({lines} lines)"
+            written["run.liggghts"] = {"digest": run_digest}
+        # Commit point: the restart and both scripts change together, with no step in between
+        stale_path = prepare_restart(output_dir, cache_dir, fingerprint)
+        for partial_path, filepath in staged:
+            os.replace(partial_path, filepath)
+        scripts.update(written)
+        if stale_path:
+            messages.append(f"Warning: the settled bed no longer matches the setup inputs, it was renamed to {os.path.basename(stale_path)}")
+        if unchanged:
+            messages.append(f"Inputs unchanged, kept {' and '.join(unchanged)}")
+    finally:
+        for partial_path, _ in staged:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        # Also written on cancellation, so the records match the files rewritten so far
+        phase("export manifest")
+        write_export_manifest(output_dir, manifest)
+    return messages
 
 class LIGGGHTS_OT_GenerateInput(bpy.types.Operator):
-    """Generate LIGGGHTS input files for rigid or deformable meshes"""
+    """Generate LIGGGHTS input files for rigid or deformable meshes. Press Esc to cancel"""
     bl_idname = "liggghts.generate_input"
     bl_label = "Generate Input"
 
     filepath: bpy.props.StringProperty(subtype='DIR_PATH')
     deformable: bpy.props.BoolProperty(default=False)
 
+    _timer = None
+    _steps = None
+    _messages = None
+
     def invoke(self, context, event):
         context.window_manager.fileselect_add(self)
         return {'RUNNING_MODAL'}
 
     def execute(self, context):
         output_dir = bpy.path.abspath(self.filepath)
-        generate_input_files(context, output_dir, deformable=self.deformable)
+        scene = context.scene
+        if not scene.liggghts_simulation_volume or not scene.liggghts_insertion_volume:
+            self.report({'ERROR'}, "Set the simulation and insertion volumes first")
+            return {'CANCELLED'}
+        if scene.liggghts_max_core_hours > 0:
+            cost = scene_cost_estimate(scene)
+            if cost["core_hours"] > scene.liggghts_max_core_hours:
+                self.report({'ERROR'}, f"Estimated cost exceeds {scene.liggghts_max_core_hours:g} core-hours: {describe_cost(cost)}")
+                return {'CANCELLED'}
+        if context.window is None:
+            # Run from a script without a window: nothing to keep responsive
+            self.report_done(output_dir, generate_input_files(context, output_dir, deformable=self.deformable))
+            return {'FINISHED'}
+
+        # Advance the generation a bounded slice per timer tick so the UI keeps redrawing
+        self._messages = []
+        self._steps = profiled_generation(context, output_dir, self.deformable, self._messages)
+        window_manager = context.window_manager
+        window_manager.progress_begin(0.0, 1.0)
+        self._timer = window_manager.event_timer_add(TICK_SECONDS, window=context.window)
+        window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            self._steps.close()
+            self.end(context)
+            self.report({'WARNING'}, "Generation cancelled: finished meshes were kept and the scripts were not changed")
+            return {'CANCELLED'}
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        deadline = time.perf_counter() + SLICE_SECONDS
+        try:
+            while True:
+                fraction, status = next(self._steps)
+                if time.perf_counter() >= deadline:
+                    break
+        except StopIteration:
+            self.end(context)
+            self.report_done(bpy.path.abspath(self.filepath), self._messages)
+            return {'FINISHED'}
+        except Exception as error:
+            self.end(context)
+            self.report({'ERROR'}, f"Generation failed: {error}")
+            return {'CANCELLED'}
+        context.window_manager.progress_update(fraction)
+        context.workspace.status_text_set(f"LIGGGHTS: {status} ({fraction:.0%}), Esc to cancel")
+        return {'RUNNING_MODAL'}
+
+    def end(self, context):
+        """Remove the timer, progress indicator and status text of a modal run."""
+        window_manager = context.window_manager
+        window_manager.event_timer_remove(self._timer)
+        window_manager.progress_end()
+        context.workspace.status_text_set(None)
+
+    def report_done(self, output_dir, messages):
         input_type = "Deformable" if self.deformable else "Rigid"
-        self.report({'INFO'}, f"{input_type} input files generated in {output_dir}")
-        return {'FINISHED'}
+        self.report({'INFO'}, "\n".join([f"{input_type} input files generated in {output_dir}"] + messages))
 
 # Register the operator
 classes = [LIGGGHTS_OT_GenerateInput]
@@ -1,36 +1,271 @@
 import bpy
 import os
+import math
+import tempfile
+import numpy as np
+from .stl_writer import transform_points, transform_normals, write_stl
+from .export_manifest import inputs_digest
+from .profiling import count, span
+from .deformable_cache import (
+    DEFORMABLE_MANIFEST, create_position_cache, merge_deformable_manifests, open_position_cache,
+    position_digest, read_deformable_manifest, write_deformable_manifest,
+)
+from .steps import drain
+from .workers import addon_import_path, blender_command, iter_blender_workers, saved_blend_path, split_frames
 
-def ensure_stl_export_addon():
-    """Ensure the STL export addon is enabled."""
-    if not bpy.ops.wm.stl_export.poll():
-        bpy.ops.preferences.addon_enable(module="io_mesh_stl")
+def get_world_mesh(obj, depsgraph=None):
+    """Return the evaluated mesh of obj as world-space (v, 3) vertices, (n, 3) triangle indices and (n, 3) normals."""
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    eval_obj = obj.evaluated_get(depsgraph)
+    mesh = eval_obj.to_mesh()
+    try:
+        mesh.calc_loop_triangles()
+        tri_count = len(mesh.loop_triangles)
 
-def export_stl(filepath, objects):
-    """Export the given objects as an STL file."""
-    ensure_stl_export_addon()
-    bpy.ops.object.select_all(action='DESELECT')
+        coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", coords)
+        tri_indices = np.empty(tri_count * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", tri_indices)
+        normals = np.empty(tri_count * 3, dtype=np.float32)
+        mesh.loop_triangles.foreach_get("normal", normals)
+
+        matrix = np.array(eval_obj.matrix_world, dtype=np.float64)
+    finally:
+        eval_obj.to_mesh_clear()
+
+    # Transform every vertex once; triangles gather their corners afterwards
+    world_coords = transform_points(coords.reshape(-1, 3), matrix)
+    normals = transform_normals(normals.reshape(-1, 3).astype(np.float64), matrix)
+    return world_coords, tri_indices.reshape(-1, 3), normals
+
+def geometry_digest(obj, depsgraph=None):
+    """Hash the evaluated world-space geometry of obj together with its modifier stack."""
+    world_coords, tri_indices, _ = get_world_mesh(obj, depsgraph)
+    modifiers = [(modifier.name, modifier.type, modifier.show_viewport) for modifier in obj.modifiers]
+    return inputs_digest(world_coords, tri_indices, modifiers)
+
+def get_world_triangles(obj, depsgraph=None):
+    """Return the evaluated mesh of obj as world-space (n, 3, 3) triangles and (n, 3) normals."""
+    world_coords, tri_indices, normals = get_world_mesh(obj, depsgraph)
+    return world_coords[tri_indices], normals
+
+def target_triangle_count(triangles, edge_length):
+    """Estimate how many equilateral triangles of the given edge length cover the same area."""
+    areas = 0.5 * np.linalg.norm(np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]), axis=1)
+    return max(4, int(math.ceil(areas.sum() / (math.sqrt(3) / 4 * edge_length ** 2))))
+
+def get_decimated_world_triangles(obj, edge_length, depsgraph=None):
+    """Return obj's world-space triangles decimated towards a target edge length.
+
+    Decimation runs on a temporary copy of the evaluated mesh, so the user's
+    object and data are never modified. Returns the triangles, their normals
+    and the triangle count before decimation.
+    """
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    triangles, normals = get_world_triangles(obj, depsgraph)
+    source_count = len(triangles)
+    target_count = target_triangle_count(triangles, edge_length)
+    if target_count >= source_count:
+        return triangles, normals, source_count
+
+    mesh = bpy.data.meshes.new_from_object(obj.evaluated_get(depsgraph))
+    temp_obj = bpy.data.objects.new(f"{obj.name}_liggghts_decimate", mesh)
+    temp_obj.matrix_world = obj.matrix_world
+    bpy.context.scene.collection.objects.link(temp_obj)
+    try:
+        modifier = temp_obj.modifiers.new("LIGGGHTS Decimate", 'DECIMATE')
+        modifier.decimate_type = 'COLLAPSE'
+        modifier.ratio = target_count / source_count
+        modifier.use_collapse_triangulate = True
+        bpy.context.view_layer.update()
+        triangles, normals = get_world_triangles(temp_obj, bpy.context.evaluated_depsgraph_get())
+    finally:
+        bpy.data.objects.remove(temp_obj)
+        bpy.data.meshes.remove(mesh)
+    return triangles, normals, source_count
+
+def count_triangles(obj, edge_length=None, depsgraph=None):
+    """Return obj's triangle count before and after decimation towards edge_length."""
+    if edge_length:
+        triangles, _, source_count = get_decimated_world_triangles(obj, edge_length, depsgraph)
+        return source_count, len(triangles)
+    triangles, _ = get_world_triangles(obj, depsgraph)
+    return len(triangles), len(triangles)
+
+def export_stl(filepath, objects, ascii_format=False, depsgraph=None, edge_length=None):
+    """Export the given objects as a single world-space STL file.
+
+    When edge_length is given, each mesh is decimated towards that edge
+    length first. Returns the triangle counts before and after decimation.
+    """
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    parts = []
+    source_count = 0
     for obj in objects:
-        obj.select_set(True)
-    bpy.context.view_layer.objects.active = objects[0]  # Set an active object
-    bpy.ops.wm.stl_export(filepath=filepath, export_selected_objects=True, ascii_format=True)
+        with span(f"evaluate mesh/{obj.name}"):
+            if edge_length:
+                triangles, normals, triangle_count = get_decimated_world_triangles(obj, edge_length, depsgraph)
+            else:
+                triangles, normals = get_world_triangles(obj, depsgraph)
+                triangle_count = len(triangles)
+        parts.append((triangles, normals))
+        source_count += triangle_count
+    triangles = np.concatenate([tris for tris, _ in parts])
+    normals = np.concatenate([norms for _, norms in parts])
+    with span(f"write STL/{os.path.basename(filepath)}"):
+        write_stl(filepath, triangles, normals, ascii_format=ascii_format, name=objects[0].name)
+    return source_count, len(triangles)
 
-def export_rigid_stls(output_dir, objects):
-    """Export each object as a separate STL file for rigid meshes."""
+def export_rigid_stls(output_dir, objects, ascii_format=False, edge_length=None):
+    """Export each object as a separate STL file for rigid meshes.
+
+    Returns the triangle counts before and after decimation per object name.
+    """
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    counts = {}
     for obj in objects:
         filepath = os.path.join(output_dir, f"{obj.name}.stl")
-        export_stl(filepath, [obj])
+        counts[obj.name] = export_stl(filepath, [obj], ascii_format=ascii_format, depsgraph=depsgraph, edge_length=edge_length)
+    return counts
+
+def create_deformable_caches(output_dir, objects, frame_start, frame_end):
+    """Evaluate objects at frame_start and allocate their shared-topology position caches.
+
+    A manifest left by an earlier export is removed, since it no longer
+    describes the reallocated caches. Returns each object's evaluated
+    (world coordinates, triangle indices) at frame_start, so that frame
+    need not be evaluated again.
+    """
+    manifest_path = os.path.join(output_dir, DEFORMABLE_MANIFEST)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    bpy.context.scene.frame_set(frame_start)
+    count("frames evaluated")
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    evaluated = {}
+    for obj in objects:
+        world_coords, tri_indices, _ = get_world_mesh(obj, depsgraph)
+        create_position_cache(output_dir, obj.name, tri_indices, len(world_coords), frame_end - frame_start + 1)
+        evaluated[obj.name] = (world_coords, tri_indices)
+    return evaluated
+
+def export_deformable_stls(output_dir, objects, frame_start, frame_end, tolerance=0.0,
+                           manifest_path=None, progress=None, cache_start=None):
+    """Cache the evaluated positions of deformable meshes for every frame; see iter_deformable_stls.
+
+    progress is called once per cached frame. Returns the manifest.
+    """
+    steps = iter_deformable_stls(output_dir, objects, frame_start, frame_end, tolerance, manifest_path, cache_start)
+    return drain(steps, progress and (lambda done: progress()))
 
-def export_deformable_stls(output_dir, objects, frame_start, frame_end):
-    """Export objects as STL files for each frame in the range for deformable meshes."""
+def iter_deformable_stls(output_dir, objects, frame_start, frame_end, tolerance=0.0,
+                         manifest_path=None, cache_start=None):
+    """Cache the evaluated positions of deformable meshes for every frame and record their unique frames.
+
+    Each object's triangle topology is written once and its world-space
+    vertex positions go to a memory-mapped (frames, vertices, 3) .npy. The
+    returned manifest maps every frame of every object to the STL of its
+    last unique frame; the STL files themselves are materialised on demand
+    with materialize_deformable_stls. The manifest is also written to
+    manifest_path (deformable_manifest.json in output_dir by default).
+
+    cache_start is the first frame of existing caches to fill in; when it is
+    None new caches covering frame_start..frame_end are created. Yields
+    (frames cached, frame count) after every frame and returns the manifest.
+    """
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
+    evaluated = None
+    if cache_start is None:
+        cache_start = frame_start
+        # Allocating the caches evaluates frame_start, which the first iteration reuses
+        evaluated = create_deformable_caches(output_dir, objects, frame_start, frame_end)
+
+    caches = {obj.name: open_position_cache(output_dir, obj.name, mode="r+") for obj in objects}
+    frames = {obj.name: {} for obj in objects}
+    unique = {}
+    last_written = {}
 
     for frame in range(frame_start, frame_end + 1):
-        bpy.context.scene.frame_set(frame)
+        if evaluated is None:
+            with span("frame_set"):
+                bpy.context.scene.frame_set(frame)
+                depsgraph = bpy.context.evaluated_depsgraph_get()
+            count("frames evaluated")
         for obj in objects:
-            filepath = os.path.join(output_dir, f"{obj.name}_{frame}.stl")
-            export_stl(filepath, [obj])
\ No newline at end of file
+            if evaluated is not None:
+                world_coords, tri_indices = evaluated[obj.name]
+            else:
+                with span(f"evaluate mesh/{obj.name}"):
+                    world_coords, tri_indices, _ = get_world_mesh(obj, depsgraph)
+            topology, positions = caches[obj.name]
+            if world_coords.shape[0] != positions.shape[1] or not np.array_equal(tri_indices, topology):
+                raise ValueError(f"{obj.name} changes topology at frame {frame}; deformable meshes must keep the same triangles")
+            positions[frame - cache_start] = world_coords
+            digest = position_digest(positions[frame - cache_start], tolerance)
+
+            # Point unchanged frames at the previous unique frame instead of a copy
+            previous = last_written.get(obj.name)
+            if previous is not None and previous[0] == digest:
+                frames[obj.name][frame] = previous[1]
+                continue
+
+            filename = f"{obj.name}_{frame}.stl"
+            frames[obj.name][frame] = filename
+            unique[filename] = {"object": obj.name, "frame": frame, "digest": digest}
+            last_written[obj.name] = (digest, filename)
+
+        evaluated = None
+        yield frame - frame_start + 1, frame_end - frame_start + 1
+
+    for _, positions in caches.values():
+        positions.flush()
+
+    manifest = {"cache_start": cache_start, "frame_start": frame_start, "frame_end": frame_end, "tolerance": tolerance,
+                "frames": frames, "unique": unique}
+    write_deformable_manifest(manifest_path or os.path.join(output_dir, DEFORMABLE_MANIFEST), manifest)
+    return manifest
+
+def export_deformable_stls_parallel(output_dir, objects, frame_start, frame_end, workers, tolerance=0.0, progress=None):
+    """Cache deformable frames across background Blender processes; see iter_deformable_stls_parallel.
+
+    progress is called with the number of frames cached so far by all workers.
+    """
+    return drain(iter_deformable_stls_parallel(output_dir, objects, frame_start, frame_end, workers, tolerance), progress)
+
+def iter_deformable_stls_parallel(output_dir, objects, frame_start, frame_end, workers, tolerance=0.0):
+    """Cache deformable frames by splitting the frame range across background Blender processes.
+
+    The position caches are allocated here and each worker fills one
+    contiguous chunk of them; the chunk manifests are merged afterwards.
+    Yields (frames cached, frame count) while the workers run and returns
+    the merged manifest.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    create_deformable_caches(output_dir, objects, frame_start, frame_end)
+
+    import_dir, package = addon_import_path()
+    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "deformable_worker.py")
+    chunks = split_frames(frame_start, frame_end, workers)
+
+    with tempfile.TemporaryDirectory(prefix="liggghts_") as temp_dir:
+        blend_path = saved_blend_path(temp_dir)
+        manifest_paths = [os.path.join(temp_dir, f"manifest_{start}.json") for start, _ in chunks]
+        commands = []
+        for (start, end), manifest_path in zip(chunks, manifest_paths):
+            args = [import_dir, package, output_dir, start, end, frame_start, tolerance, manifest_path]
+            commands.append(blender_command(blend_path, script_path, args + [obj.name for obj in objects]))
+        frame_count = frame_end - frame_start + 1
+        for done in iter_blender_workers(commands):
+            yield done, frame_count
+        count("frames evaluated", frame_count)
+        chunk_manifests = [read_deformable_manifest(path) for path in manifest_paths]
+
+    return merge_deformable_manifests(output_dir, chunk_manifests)
@@ -0,0 +1,170 @@
+import numpy as np
+
+def rotation_quaternions(matrices):
+    """Convert (..., 4, 4) transforms to (..., 4) unit (w, x, y, z) rotation quaternions, ignoring scale.
+
+    Uses Shepperd's method: each matrix takes whichever of the four
+    candidate formulas has the largest, and so best conditioned, divisor.
+    """
+    m = matrices[..., :3, :3]
+    m = m / np.linalg.norm(m, axis=-2, keepdims=True)
+    m00, m01, m02 = m[..., 0, 0], m[..., 0, 1], m[..., 0, 2]
+    m10, m11, m12 = m[..., 1, 0], m[..., 1, 1], m[..., 1, 2]
+    m20, m21, m22 = m[..., 2, 0], m[..., 2, 1], m[..., 2, 2]
+    diagonals = np.stack((m00 + m11 + m22, m00 - m11 - m22, m11 - m00 - m22, m22 - m00 - m11), axis=-1)
+    s = 2 * np.sqrt(np.maximum(1 + diagonals, 0.0))
+    s = np.where(s > 0, s, 1.0)
+    candidates = np.stack((
+        np.stack((s[..., 0] / 4, (m21 - m12) / s[..., 0], (m02 - m20) / s[..., 0], (m10 - m01) / s[..., 0]), axis=-1),
+        np.stack(((m21 - m12) / s[..., 1], s[..., 1] / 4, (m01 + m10) / s[..., 1], (m02 + m20) / s[..., 1]), axis=-1),
+        np.stack(((m02 - m20) / s[..., 2], (m01 + m10) / s[..., 2], s[..., 2] / 4, (m12 + m21) / s[..., 2]), axis=-1),
+        np.stack(((m10 - m01) / s[..., 3], (m02 + m20) / s[..., 3], (m12 + m21) / s[..., 3], s[..., 3] / 4), axis=-1),
+    ), axis=-2)
+    choice = np.argmax(diagonals, axis=-1)[..., None, None]
+    quats = np.take_along_axis(candidates, choice, axis=-2)[..., 0, :]
+    return quats / np.linalg.norm(quats, axis=-1, keepdims=True)
+
+def hemisphere_continuous(quats):
+    """Flip (frames, ...) quaternions so each lies in the same hemisphere as the previous frame's.
+
+    q and -q are the same rotation; without this a sign change between
+    frames would show up as a spurious near-360-degree rotation.
+    """
+    dots = np.sum(quats[1:] * quats[:-1], axis=-1)
+    signs = np.cumprod(np.where(dots < 0, -1.0, 1.0), axis=0)
+    continuous = quats.copy()
+    continuous[1:] *= signs[..., None]
+    return continuous
+
+def quaternion_multiply(a, b):
+    """Hamilton product of (..., 4) quaternion arrays."""
+    w1, x1, y1, z1 = np.moveaxis(a, -1, 0)
+    w2, x2, y2, z2 = np.moveaxis(b, -1, 0)
+    return np.stack((
+        w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+        w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+        w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+        w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
+    ), axis=-1)
+
+def quaternion_axis_angles(quats):
+    """Split (..., 4) unit quaternions with w >= 0 into unit axes and angles in [0, pi].
+
+    Identity rotations get a zero axis.
+    """
+    sines = np.linalg.norm(quats[..., 1:], axis=-1)
+    angles = 2 * np.arctan2(sines, quats[..., 0])
+    axes = quats[..., 1:] / np.where(sines > 0, sines, 1.0)[..., None]
+    return axes, angles
+
+def rotation_axes_periods(angular):
+    """Split (..., 3) angular velocities into unit axes and rotation periods in seconds.
+
+    Zero angular velocities get a zero axis and an infinite period.
+    """
+    speeds = np.linalg.norm(angular, axis=-1)
+    moving = speeds > 0
+    axes = angular / np.where(moving, speeds, 1.0)[..., None]
+    periods = np.where(moving, 2 * np.pi / np.where(moving, speeds, 1.0), np.inf)
+    return axes, periods
+
+def frame_motion(world_matrices, frame_rate, linear_epsilon=0.0, angular_epsilon=0.0):
+    """Compute per-frame rigid motion from sampled world matrices.
+
+    Returns origins, linear velocities and angular velocity vectors (axis
+    times angular speed in rad/s), each of shape (frames - 1, objects, 3).
+    Step i describes the motion from sampled frame i to frame i + 1.
+    Linear speeds up to linear_epsilon (m/s) and angular speeds up to
+    angular_epsilon (rad/s) are treated as exactly zero, so float noise on
+    static objects does not become motion.
+    """
+    world_matrices = np.asarray(world_matrices, dtype=np.float64)
+    locations = world_matrices[..., :3, 3]
+
+    quats = hemisphere_continuous(rotation_quaternions(world_matrices))
+    # The rotation from one frame to the next, as Maya's quat1.inverse() * quat2
+    conjugates = quats[:-1] * np.array([1.0, -1.0, -1.0, -1.0])
+    axes, angles = quaternion_axis_angles(quaternion_multiply(quats[1:], conjugates))
+
+    speeds = angles * frame_rate
+    speeds[speeds <= angular_epsilon] = 0.0
+    angular = axes * speeds[..., None]
+
+    linear = np.diff(locations, axis=0) * frame_rate
+    linear[np.linalg.norm(linear, axis=-1) <= linear_epsilon] = 0.0
+    return locations[:-1].copy(), linear, angular
+
+def cross_matrices(vectors):
+    """Return the (..., 3, 3) matrices [v]x with [v]x @ u == cross(v, u)."""
+    x, y, z = np.moveaxis(np.asarray(vectors, dtype=np.float64), -1, 0)
+    zero = np.zeros_like(x)
+    return np.stack((
+        np.stack((zero, -z, y), axis=-1),
+        np.stack((z, zero, -x), axis=-1),
+        np.stack((-y, x, zero), axis=-1),
+    ), axis=-2)
+
+def pivot_velocity_terms(linear, angular, frame_rate):
+    """Return the terms of the linear velocities that reproduce each step's motion about a fixed pivot.
+
+    Turning at the step's angular velocity w about a pivot o held fixed in
+    space while translating at a constant V moves a point p over the step
+    to R (p - o) + o + M V, where R is the step's rotation and M the
+    integral of exp(s [w]x) over the step. Matching the sampled motion,
+    which turns about the centre c and moves it by linear / frame_rate,
+    gives V = base + A @ (o - c); returns base and A.
+    """
+    dt = 1 / frame_rate
+    cross = cross_matrices(angular)
+    cross_squared = cross @ cross
+    speeds = np.linalg.norm(angular, axis=-1)
+    turning = speeds > 0
+    safe = np.where(turning, speeds, 1.0)
+    angles = speeds * dt
+    # Small-angle limits of the series where the object does not turn
+    sine_term = np.where(turning, np.sin(angles) / safe, dt)
+    cosine_term = np.where(turning, (1 - np.cos(angles)) / safe ** 2, dt ** 2 / 2)
+    integral_term = np.where(turning, (angles - np.sin(angles)) / safe ** 3, dt ** 3 / 6)
+    identity = np.eye(3)
+    rotation = identity + sine_term[..., None, None] * cross + cosine_term[..., None, None] * cross_squared
+    integral = dt * identity + cosine_term[..., None, None] * cross + integral_term[..., None, None] * cross_squared
+    base = np.linalg.solve(integral, (np.asarray(linear, dtype=np.float64) * dt)[..., None])[..., 0]
+    return base, np.linalg.solve(integral, rotation - identity)
+
+def pivot_velocities(origins, linear, angular, frame_rate, pivots):
+    """Return the linear velocities that carry each step's motion while it rotates about pivots held fixed; see pivot_velocity_terms."""
+    base, offsets = pivot_velocity_terms(linear, angular, frame_rate)
+    return base + (offsets @ (np.asarray(pivots) - origins)[..., None])[..., 0]
+
+def compress_motion(linear, angular, linear_tolerance=0.0, angular_tolerance=0.0, origins=None, frame_rate=None):
+    """Split each object's per-frame motion into segments of near-constant velocity.
+
+    A segment continues while every step's linear and angular velocity stays
+    within the tolerances of the segment's first step. With origins and
+    frame_rate, the linear velocity compared is the one that carries the
+    step about the segment's first origin held fixed, as the run script
+    rotates: an object that translates while it rotates has no single
+    velocity field about a fixed point. Returns, per object, a list of
+    (start, stop) step ranges with stop exclusive.
+    """
+    step_count, object_count = linear.shape[:2]
+    if origins is not None:
+        base, offsets = pivot_velocity_terms(linear, angular, frame_rate)
+    segments = []
+    for index in range(object_count):
+        object_segments = []
+        start = 0
+        for step in range(1, step_count):
+            if origins is None:
+                linear_change = np.linalg.norm(linear[step, index] - linear[start, index])
+            else:
+                velocity = base[step, index] + offsets[step, index] @ (origins[start, index] - origins[step, index])
+                linear_change = np.linalg.norm(velocity - base[start, index])
+            angular_change = np.linalg.norm(angular[step, index] - angular[start, index])
+            if linear_change > linear_tolerance or angular_change > angular_tolerance:
+                object_segments.append((start, step))
+                start = step
+        if step_count > 0:
+            object_segments.append((start, step_count))
+        segments.append(object_segments)
+    return segments
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import cProfile
+import contextlib
+
+PROFILE_FILE = "liggghts_profile.json"
+CPROFILE_FILE = "liggghts_profile.prof"
+
+_active = None  # the Profile collecting spans and counters, if a session is running
+
+class Profile:
+    """Accumulated timing spans and counters of one profiling session.
+
+    Time is only counted while the profile is active, so a session driven
+    step by step from a modal operator excludes the time between steps.
+    """
+
+    def __init__(self, cprofile=False):
+        self.spans = {}  # "phase/sub-phase" path -> [seconds, calls]
+        self.counters = {}
+        self.stack = []
+        self.phase = None  # (name, start) of the running top-level phase
+        self.seconds = 0.0
+        self.resumed = None  # perf_counter() when the profile was last made active
+        self.profiler = cProfile.Profile() if cprofile else None
+
+    def now(self):
+        """Return the seconds this profile has been active so far."""
+        if self.resumed is None:
+            return self.seconds
+        return self.seconds + time.perf_counter() - self.resumed
+
+    def add(self, path, seconds):
+        entry = self.spans.setdefault(path, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def end_phase(self):
+        if self.phase is not None:
+            name, start = self.phase
+            self.add(name, self.now() - start)
+            self.stack.pop(0)
+            self.phase = None
+
+@contextlib.contextmanager
+def span(name):
+    """Time a block under the current span path; does nothing outside a session."""
+    profile = _active
+    if profile is None:
+        yield
+        return
+    profile.stack.append(name)
+    path = "/".join(profile.stack)
+    start = profile.now()
+    try:
+        yield
+    finally:
+        profile.add(path, profile.now() - start)
+        profile.stack.pop()
+
+def phase(name):
+    """End the running top-level phase and start the next one, so sequential steps need no nesting."""
+    profile = _active
+    if profile is None:
+        return
+    profile.end_phase()
+    profile.stack.insert(0, name)
+    profile.phase = (name, profile.now())
+
+def count(name, amount=1):
+    """Add to a counter of the current session, if any."""
+    if _active is not None:
+        _active.counters[name] = _active.counters.get(name, 0) + amount
+
+@contextlib.contextmanager
+def active(profile):
+    """Collect spans and counters into profile for the duration of the block."""
+    global _active
+    previous = _active
+    _active = profile
+    profile.resumed = time.perf_counter()
+    profiling = False
+    if profile.profiler is not None:
+        try:
+            profile.profiler.enable()
+            profiling = True
+        except ValueError:
+            # Another profiler, such as an outer session's, is already running
+            pass
+    try:
+        yield profile
+    finally:
+        if profiling:
+            profile.profiler.disable()
+        profile.seconds = profile.now()
+        profile.resumed = None
+        _active = previous
+
+def finish_profile(profile, json_path=None, cprofile_path=None):
+    """Close the running phase and write the profile and its cProfile statistics where paths are given."""
+    profile.end_phase()
+    if json_path and os.path.isdir(os.path.dirname(json_path) or "."):
+        write_profile(json_path, profile)
+        if profile.profiler is not None and cprofile_path:
+            profile.profiler.dump_stats(cprofile_path)
+
+def write_profile(filepath, profile):
+    """Write a profile's spans and counters as JSON, slowest spans first."""
+    spans = sorted(profile.spans.items(), key=lambda item: -item[1][0])
+    with open(filepath, "w") as file:
+        json.dump({
+            "seconds": profile.seconds,
+            "spans": [{"path": path, "seconds": seconds, "calls": calls} for path, (seconds, calls) in spans],
+            "counters": profile.counters,
+        }, file, indent=1)
+
+def summarize(profile, top=4):
+    """Return a one-line summary of the slowest top-level phases and the counters."""
+    phases = sorted(((path, seconds) for path, (seconds, _) in profile.spans.items() if "/" not in path), key=lambda item: -item[1])
+    parts = [f"{path} {seconds:.2f}s" for path, seconds in phases[:top]]
+    counters = [f"{value} {name}" for name, value in sorted(profile.counters.items())]
+    return f"Took {profile.seconds:.2f}s: " + ", ".join(parts) + ("; " + ", ".join(counters) if counters else "")
@@ -0,0 +1,152 @@
+import os
+import json
+import shutil
+import hashlib
+
+RESTART_FILE = "restart.res"
+FINGERPRINT_FILE = "restart.fingerprint"
+STALE_SUFFIX = ".stale"
+FINGERPRINT_VERSION = 1  # bump when the setup script changes in a way that affects the settled bed
+
+def file_digest(filepath, chunk_size=1 << 20):
+    """Hash a file's contents without reading it into memory at once."""
+    digest = hashlib.sha1()
+    with open(filepath, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def settle_fingerprint(simulation_params, sim_min, sim_max, ins_min, ins_max, tray_path=None):
+    """Fingerprint every input of setup.liggghts that affects the settled bed."""
+    inputs = {
+        "version": FINGERPRINT_VERSION,
+        "params": {key: simulation_params.get(key) for key in (
+            "radius", "youngs_modulus", "cohesion", "poisson_ratio", "density", "timestep",
+            "settle_max_steps", "settle_block", "settle_speed")},
+        "domain": [list(sim_min[:3]), list(sim_max[:3])],
+        "insertion": [list(ins_min[:3]), list(ins_max[:3])],
+        "tray": file_digest(tray_path) if tray_path and os.path.exists(tray_path) else None,
+    }
+    return hashlib.sha1(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+def cached_restart_path(cache_dir, fingerprint):
+    """Return where the cache keeps the restart file of a fingerprint."""
+    return os.path.join(cache_dir, f"{fingerprint}.res")
+
+def restart_identity(restart_path):
+    """Return the size and modification time that identify a restart file's current contents."""
+    stat = os.stat(restart_path)
+    return f"{stat.st_size} {stat.st_mtime_ns}"
+
+def read_fingerprint_record(output_dir):
+    """Return the recorded fingerprint and the identity of the restart restored for it, each None when not recorded."""
+    filepath = os.path.join(output_dir, FINGERPRINT_FILE)
+    if not os.path.exists(filepath):
+        return None, None
+    with open(filepath) as file:
+        lines = file.read().splitlines()
+    return (lines[0].strip() if lines else None), (lines[1].strip() if len(lines) > 1 else None)
+
+def read_fingerprint(output_dir):
+    """Return the fingerprint recorded next to an output directory's restart file, or None."""
+    return read_fingerprint_record(output_dir)[0]
+
+def write_fingerprint(output_dir, fingerprint, restored=None):
+    """Record the fingerprint of the settled bed next to restart.res, with the identity of a restart restored from the cache."""
+    with open(os.path.join(output_dir, FINGERPRINT_FILE), "w") as file:
+        file.write(fingerprint + "\n")
+        if restored:
+            file.write(restored + "\n")
+
+def restart_is_current(output_dir, fingerprint):
+    """Return whether the output directory's restart file holds the settled bed of this fingerprint.
+
+    That is either the restart restored from the cache for it, still
+    unchanged, or one setup.liggghts wrote after the fingerprint was
+    recorded. Linked and copied restarts keep the cached file's older
+    modification time, so they are recognised by identity instead.
+    """
+    restart_path = os.path.join(output_dir, RESTART_FILE)
+    recorded, restored = read_fingerprint_record(output_dir)
+    if recorded != fingerprint or not os.path.exists(restart_path):
+        return False
+    if restored is not None and restored == restart_identity(restart_path):
+        return True
+    return os.path.getmtime(restart_path) >= os.path.getmtime(os.path.join(output_dir, FINGERPRINT_FILE))
+
+def link_or_copy(source, destination):
+    """Hard-link source to destination, copying when the two are on different file systems."""
+    if os.path.exists(destination):
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+def harvest_restart(output_dir, cache_dir):
+    """Add an output directory's restart file to the cache if setup.liggghts produced it for the recorded fingerprint.
+
+    The restart must be newer than the fingerprint, otherwise it belongs to
+    an earlier generation. Returns whether the cache gained a file.
+    """
+    fingerprint = read_fingerprint(output_dir)
+    if fingerprint is None or not restart_is_current(output_dir, fingerprint):
+        return False
+    cached_path = cached_restart_path(cache_dir, fingerprint)
+    if os.path.exists(cached_path):
+        return False
+    os.makedirs(cache_dir, exist_ok=True)
+    # Copy rather than link: a later write_restart in the output directory rewrites the file in place
+    shutil.copy2(os.path.join(output_dir, RESTART_FILE), cached_path)
+    return True
+
+def restart_available(output_dir, cache_dir, fingerprint):
+    """Return whether prepare_restart would find the settled bed of the fingerprint, without changing any file."""
+    if restart_is_current(output_dir, fingerprint):
+        return True
+    return bool(cache_dir) and os.path.exists(cached_restart_path(cache_dir, fingerprint))
+
+def set_aside_restart(output_dir, cache_dir):
+    """Move the output directory's restart file out of run.liggghts' way without losing a settled bed.
+
+    It is only removed when the cache already holds the same bed, otherwise
+    it is renamed to restart.res.stale, replacing an earlier stale one.
+    Returns the path it was renamed to, or None.
+    """
+    restart_path = os.path.join(output_dir, RESTART_FILE)
+    if not os.path.exists(restart_path):
+        return None
+    fingerprint = read_fingerprint(output_dir)
+    if cache_dir and fingerprint is not None:
+        cached_path = cached_restart_path(cache_dir, fingerprint)
+        if os.path.exists(cached_path) and (os.path.samefile(restart_path, cached_path)
+                                            or restart_is_current(output_dir, fingerprint)):
+            os.remove(restart_path)
+            return None
+    stale_path = restart_path + STALE_SUFFIX
+    os.replace(restart_path, stale_path)
+    return stale_path
+
+def prepare_restart(output_dir, cache_dir, fingerprint):
+    """Make sure the output directory holds the settled bed of the fingerprint if one is known.
+
+    The current restart is kept if it matches, otherwise a cached one is
+    linked in. Any other restart is set aside so that it is neither read by
+    run.liggghts nor overwritten in place while linked to the cache.
+    Returns the path a restart was set aside to, or None.
+    """
+    restart_path = os.path.join(output_dir, RESTART_FILE)
+    if cache_dir:
+        harvest_restart(output_dir, cache_dir)
+    if restart_is_current(output_dir, fingerprint):
+        return None
+
+    stale_path = set_aside_restart(output_dir, cache_dir)
+    if cache_dir and os.path.exists(cached_restart_path(cache_dir, fingerprint)):
+        link_or_copy(cached_restart_path(cache_dir, fingerprint), restart_path)
+        write_fingerprint(output_dir, fingerprint, restart_identity(restart_path))
+        return stale_path
+    # Only rewrite an unchanged fingerprint's file when needed, its age tells a current restart from a stale one
+    if read_fingerprint(output_dir) != fingerprint:
+        write_fingerprint(output_dir, fingerprint)
+    return stale_path
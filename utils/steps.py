@@ -0,0 +1,32 @@
+"""Helpers for long-running stages split into resumable steps.
+
+A stage is a generator that yields (done, total) after each bounded unit
+of work and returns its result. drain runs one to completion in a single
+call; relay forwards its progress as the (fraction, status) pairs shown
+by the modal generate operator.
+"""
+
+def drain(steps, progress=None):
+    """Run a step generator to completion, calling progress with each units-done count, and return its result."""
+    while True:
+        try:
+            done, _ = next(steps)
+        except StopIteration as stop:
+            return stop.value
+        if progress is not None:
+            progress(done)
+
+def relay(steps, status, start, end):
+    """Yield a step generator's progress mapped onto the fraction range start..end and return its result.
+
+    Closing the relay closes the wrapped generator, so its cleanup also runs on cancellation.
+    """
+    try:
+        while True:
+            try:
+                done, total = next(steps)
+            except StopIteration as stop:
+                return stop.value
+            yield start + (end - start) * done / max(total, 1), f"{status} {done}/{total}"
+    finally:
+        steps.close()
@@ -0,0 +1,70 @@
+import numpy as np
+from .profiling import count
+
+# Binary STL record: facet normal, three vertices and the attribute byte count
+STL_RECORD = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attribute", "<u2"),
+])
+
+def transform_points(points, matrix):
+    """Apply a 4x4 world matrix to an (n, 3) array of points."""
+    matrix = np.asarray(matrix, dtype=np.float64)
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
+
+def transform_normals(normals, matrix):
+    """Apply a 4x4 world matrix to an (n, 3) array of normals and renormalise them."""
+    matrix = np.asarray(matrix, dtype=np.float64)
+    normal_matrix = np.linalg.inv(matrix[:3, :3]).T
+    normals = normals @ normal_matrix.T
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0)
+    return normals
+
+def face_normals(triangles):
+    """Compute unit facet normals for an (n, 3, 3) array of triangle vertices."""
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0)
+    return normals
+
+def write_binary_stl(filepath, triangles, normals=None, header=b"Blender->LIGGGHTS Addon"):
+    """Write an (n, 3, 3) triangle array as a binary STL with a single buffer write."""
+    if normals is None:
+        normals = face_normals(triangles)
+    records = np.zeros(len(triangles), dtype=STL_RECORD)
+    records["normal"] = normals
+    records["vertices"] = triangles
+    with open(filepath, "wb") as file:
+        file.write(header[:80].ljust(80, b"\0"))
+        file.write(np.uint32(len(records)).tobytes())
+        file.write(records.tobytes())
+
+def write_ascii_stl(filepath, triangles, normals=None, name="liggghts"):
+    """Write an (n, 3, 3) triangle array as an ASCII STL."""
+    if normals is None:
+        normals = face_normals(triangles)
+    facets = np.concatenate((normals[:, None, :], triangles), axis=1).reshape(-1, 12)
+    facet_format = (
+        "facet normal %e %e %e\n"
+        " outer loop\n"
+        "  vertex %e %e %e\n"
+        "  vertex %e %e %e\n"
+        "  vertex %e %e %e\n"
+        " endloop\n"
+        "endfacet\n"
+    )
+    with open(filepath, "w") as file:
+        file.write(f"solid {name}\n")
+        file.write("".join(facet_format % tuple(facet) for facet in facets))
+        file.write(f"endsolid {name}\n")
+
+def write_stl(filepath, triangles, normals=None, ascii_format=False, name="liggghts"):
+    """Write triangles as a binary STL, or ASCII when requested."""
+    count("STL files written")
+    count("triangles written", len(triangles))
+    if ascii_format:
+        write_ascii_stl(filepath, triangles, normals, name=name)
+    else:
+        write_binary_stl(filepath, triangles, normals)
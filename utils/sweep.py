@@ -0,0 +1,219 @@
+import os
+import csv
+import sys
+import json
+import shutil
+import argparse
+import itertools
+import importlib
+import tempfile
+
+import bpy
+from .deformable_cache import CACHE_DIR, DEFORMABLE_MANIFEST
+from .export_manifest import EXPORT_MANIFEST
+from .generate_input import generate_input_files
+from .workers import blender_command, report_progress, run_blender_workers, saved_blend_path
+
+PROPERTY_PREFIX = "liggghts_"
+MODE_KEY = "deformable"  # sweep column choosing rigid or deformable generation rather than a scene property
+CASE_FILE = "case.json"
+TRUE_STRINGS = ("1", "true", "yes", "on")
+
+def read_sweep(filepath):
+    """Read the cases of a sweep file.
+
+    A CSV file holds one case per row with property names as headers. A
+    JSON file holds either a list of case dictionaries or a dictionary of
+    value lists, which is expanded to every combination.
+    """
+    if filepath.lower().endswith(".csv"):
+        with open(filepath, newline="") as file:
+            return [{key: value for key, value in row.items() if value != ""} for row in csv.DictReader(file)]
+    with open(filepath) as file:
+        sweep = json.load(file)
+    if isinstance(sweep, list):
+        return sweep
+    keys = list(sweep)
+    return [dict(zip(keys, values)) for values in itertools.product(*(sweep[key] for key in keys))]
+
+def property_name(key):
+    """Map a sweep column such as 'radius' to its scene property name."""
+    return key if key.startswith(PROPERTY_PREFIX) else PROPERTY_PREFIX + key
+
+def parse_bool(value):
+    """Read a boolean from a JSON value or a CSV string."""
+    return value.strip().lower() in TRUE_STRINGS if isinstance(value, str) else bool(value)
+
+def parse_number(value, kind):
+    """Convert a JSON value or CSV string to kind, reading ints written as whole floats such as "200000.0"."""
+    if kind is int:
+        number = float(value)
+        if not number.is_integer():
+            raise ValueError(f"{value!r} is not a whole number")
+        return int(number)
+    return kind(value)
+
+def parse_set(value):
+    """Read an enum flag set from a JSON list or a CSV string of space-, comma- or pipe-separated names."""
+    if isinstance(value, str):
+        return {name for name in value.replace(",", " ").replace("|", " ").split()}
+    return set(value)
+
+def apply_case(scene, case):
+    """Set the scene properties of a case, converting CSV strings to each property's type."""
+    for key, value in case.items():
+        if key == MODE_KEY:
+            continue
+        name = property_name(key)
+        if not hasattr(scene, name):
+            raise ValueError(f"Unknown sweep property '{key}'")
+        current = getattr(scene, name)
+        if isinstance(current, bool):
+            value = parse_bool(value)
+        elif isinstance(current, set):
+            value = parse_set(value)
+        else:
+            try:
+                value = parse_number(value, type(current))
+            except ValueError:
+                raise ValueError(f"Sweep column '{key}' has invalid value {value!r} (expected {type(current).__name__})") from None
+        setattr(scene, name, value)
+
+def restore_scene(scene, base):
+    """Set the scene properties back to the base values saved before the sweep."""
+    for name, value in base.items():
+        setattr(scene, name, value)
+
+def case_directory(output_root, index):
+    """Return the output directory of one case."""
+    return os.path.join(output_root, f"case_{index:04d}")
+
+def geometry_key(scene, deformable):
+    """Return the export options that decide whether two cases can share exported geometry."""
+    edge_length = scene.liggghts_decimate_edge_factor * scene.liggghts_radius if scene.liggghts_decimate and not deformable else None
+    tolerance = scene.liggghts_deformable_tolerance if deformable else None
+    return json.dumps([deformable, scene.liggghts_stl_ascii, edge_length, tolerance])
+
+def seed_case(template_dir, case_dir):
+    """Copy a template case's exported geometry, deformable cache and manifests into a new case directory.
+
+    The files are copied rather than hard-linked: the STL writers and the
+    position cache rewrite their files in place, which would otherwise
+    change the template and every case sharing it.
+    """
+    os.makedirs(case_dir, exist_ok=True)
+    for name in os.listdir(template_dir):
+        if name.endswith(".stl") or name in (EXPORT_MANIFEST, DEFORMABLE_MANIFEST):
+            shutil.copy2(os.path.join(template_dir, name), os.path.join(case_dir, name))
+    cache_dir = os.path.join(template_dir, CACHE_DIR)
+    if os.path.isdir(cache_dir):
+        os.makedirs(os.path.join(case_dir, CACHE_DIR), exist_ok=True)
+        for name in os.listdir(cache_dir):
+            shutil.copy2(os.path.join(cache_dir, name), os.path.join(case_dir, CACHE_DIR, name))
+
+def run_case(context, case, case_dir, default_deformable=False, template_dir=None, base=None):
+    """Generate one case, reusing the geometry of template_dir when given. Returns the generator messages.
+
+    The case is applied on top of the base property values, so a property it
+    leaves out keeps the scene's value rather than an earlier case's.
+    """
+    deformable = parse_bool(case.get(MODE_KEY, default_deformable))
+    restore_scene(context.scene, base or {})
+    apply_case(context.scene, case)
+    if template_dir is not None:
+        seed_case(template_dir, case_dir)
+    else:
+        os.makedirs(case_dir, exist_ok=True)
+    messages = generate_input_files(context, case_dir, deformable, reuse_deformable_cache=template_dir is not None)
+    with open(os.path.join(case_dir, CASE_FILE), "w") as file:
+        json.dump({"case": case, "deformable": deformable, "messages": messages}, file, indent=1)
+    return messages
+
+def case_geometry_key(scene, case, default_deformable=False, base=None):
+    """Apply a case on top of the base property values and return its geometry key."""
+    restore_scene(scene, base or {})
+    apply_case(scene, case)
+    return geometry_key(scene, parse_bool(case.get(MODE_KEY, default_deformable)))
+
+def run_sweep(context, sweep_path, output_root, workers=1, indices=None, default_deformable=False, templates=None, progress=None):
+    """Generate every case of a sweep under output_root.
+
+    The first case of each distinct geometry is exported in this process;
+    every other case copies that geometry in instead of exporting it again.
+    With more than one worker the remaining cases are spread over
+    background Blender processes. progress is called once per case
+    generated in this process. Each case starts from the scene's own
+    property values, which are restored afterwards.
+    """
+    scene = context.scene
+    cases = read_sweep(sweep_path)
+    indices = list(range(len(cases))) if indices is None else indices
+    names = {property_name(key) for index in indices for key in cases[index] if key != MODE_KEY}
+    saved = {name: getattr(scene, name) for name in names if hasattr(scene, name)}
+    templates = dict(templates or {})
+
+    try:
+        keys = {index: case_geometry_key(scene, cases[index], default_deformable, saved) for index in indices}
+        remaining = []
+        for index in indices:
+            if keys[index] in templates and workers > 1:
+                remaining.append(index)
+                continue
+            case_dir = case_directory(output_root, index)
+            run_case(context, cases[index], case_dir, default_deformable, templates.get(keys[index]), saved)
+            templates.setdefault(keys[index], case_dir)
+            if progress is not None:
+                progress()
+    finally:
+        restore_scene(scene, saved)
+
+    if remaining:
+        run_sweep_workers(sweep_path, output_root, workers, remaining, default_deformable, templates)
+    return len(indices)
+
+def run_sweep_workers(sweep_path, output_root, workers, indices, default_deformable, templates):
+    """Spread sweep cases over background Blender processes that share the template geometry."""
+    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sweep_worker.py")
+    with tempfile.TemporaryDirectory(prefix="liggghts_") as temp_dir:
+        blend_path = saved_blend_path(temp_dir)
+        templates_path = os.path.join(temp_dir, "templates.json")
+        with open(templates_path, "w") as file:
+            json.dump(templates, file)
+        commands = []
+        for chunk in range(min(workers, len(indices))):
+            args = [sweep_path, output_root, "--cases", ",".join(str(index) for index in indices[chunk::workers]),
+                    "--templates", templates_path]
+            if default_deformable:
+                args.append("--deformable")
+            commands.append(blender_command(blend_path, script_path, args))
+        run_blender_workers(commands, lambda done: print(f"{done}/{len(indices)} cases generated by workers", flush=True))
+
+def ensure_registered():
+    """Register the addon when Blender was started without it enabled."""
+    if not hasattr(bpy.types.Scene, "liggghts_radius"):
+        importlib.import_module(__package__.rsplit(".", 1)[0]).register()
+
+def main(argv=None):
+    """Run a sweep from the command line arguments that follow '--'."""
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="sweep", description="Generate one LIGGGHTS case directory per sweep combination.")
+    parser.add_argument("sweep", help="JSON or CSV file of scene property values")
+    parser.add_argument("output_root", help="directory that receives the case directories")
+    parser.add_argument("--workers", type=int, default=1, help="background Blender processes to spread the cases over")
+    parser.add_argument("--deformable", action="store_true", help="generate deformable cases unless a case says otherwise")
+    parser.add_argument("--cases", help="comma-separated case indices to generate (default: all)")
+    parser.add_argument("--templates", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    ensure_registered()
+    indices = [int(index) for index in args.cases.split(",")] if args.cases else None
+    templates = None
+    if args.templates:
+        with open(args.templates) as file:
+            templates = json.load(file)
+    # Workers report each case to the parent process that spawned them
+    progress = report_progress if templates is not None else None
+    count = run_sweep(bpy.context, os.path.abspath(args.sweep), os.path.abspath(args.output_root),
+                      args.workers, indices, args.deformable, templates, progress)
+    print(f"Generated {count} cases in {args.output_root}")
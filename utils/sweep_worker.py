@@ -0,0 +1,20 @@
+"""Background Blender entry point that generates the cases of a parameter sweep.
+
+Run as: blender -b scene.blend --python <addon>/utils/sweep_worker.py --
+sweep.json output_root [--workers N] [--deformable] [--cases 0,3,7]
+
+The addon is imported from the directory this script lives in, so it does
+not have to be installed or enabled.
+"""
+import os
+import sys
+import importlib
+
+def main(argv):
+    addon_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(addon_root))
+    sweep = importlib.import_module(f"{os.path.basename(addon_root)}.utils.sweep")
+    sweep.main(argv)
+
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index("--") + 1:])
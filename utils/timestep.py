@@ -0,0 +1,70 @@
+import math
+import numpy as np
+from .motion import frame_motion
+
+GRAVITY = 9.81
+
+def rayleigh_timestep(radius, density, youngs_modulus, poisson_ratio):
+    """Return the Rayleigh critical timestep of a particle."""
+    shear_modulus = youngs_modulus / (2 * (1 + poisson_ratio))
+    return math.pi * radius * math.sqrt(density / shear_modulus) / (0.1631 * poisson_ratio + 0.8766)
+
+def hertz_timestep(radius, density, youngs_modulus, poisson_ratio, collision_velocity):
+    """Return the Hertz contact duration of two identical particles colliding at collision_velocity."""
+    if collision_velocity <= 0:
+        return math.inf
+    mass = density * 4 / 3 * math.pi * radius ** 3
+    effective_mass = mass / 2
+    effective_radius = radius / 2
+    effective_modulus = youngs_modulus / (2 * (1 - poisson_ratio ** 2))
+    return 2.87 * (effective_mass ** 2 / (effective_radius * effective_modulus ** 2 * collision_velocity)) ** 0.2
+
+def rigid_max_speed(world_matrices, frame_rate, local_corners):
+    """Return the fastest speed reached by any bounding-box corner of the sampled moving objects.
+
+    local_corners holds an (8, 3) array of local bound_box corners per object.
+    """
+    if len(world_matrices) < 2:
+        return 0.0
+    _, linear, angular = frame_motion(world_matrices, frame_rate)
+    speed = 0.0
+    for index, corners in enumerate(local_corners):
+        # Corner offsets from the object origin in world space at the start of each step
+        offsets = np.einsum("fij,cj->fci", world_matrices[:-1, index, :3, :3], np.asarray(corners, dtype=np.float64))
+        velocities = linear[:, index, None, :] + np.cross(angular[:, index, None, :], offsets)
+        speed = max(speed, float(np.linalg.norm(velocities, axis=-1).max()))
+    return speed
+
+def free_fall_speed(height):
+    """Return the impact speed of a particle dropped from the given height."""
+    return math.sqrt(2 * GRAVITY * max(0.0, height))
+
+def stable_timestep(frame_duration, critical_timestep, safety_factor):
+    """Pick the largest timestep below safety_factor * critical_timestep that divides a frame exactly.
+
+    Returns the timestep and the number of timesteps per frame.
+    """
+    steps_per_frame = max(1, math.ceil(frame_duration / (safety_factor * critical_timestep)))
+    return frame_duration / steps_per_frame, steps_per_frame
+
+def compute_stable_timestep(radius, density, youngs_modulus, poisson_ratio, collision_velocity, frame_rate, safety_factor):
+    """Compute the critical timesteps and the stable timestep that fits the frame rate.
+
+    Returns a dictionary with the Rayleigh and Hertz timesteps, the chosen
+    timestep and the timesteps per frame.
+    """
+    rayleigh = rayleigh_timestep(radius, density, youngs_modulus, poisson_ratio)
+    hertz = hertz_timestep(radius, density, youngs_modulus, poisson_ratio, collision_velocity)
+    timestep, steps_per_frame = stable_timestep(1 / frame_rate, min(rayleigh, hertz), safety_factor)
+    return {
+        "rayleigh": rayleigh,
+        "hertz": hertz,
+        "collision_velocity": collision_velocity,
+        "timestep": timestep,
+        "timesteps_per_frame": steps_per_frame,
+    }
+
+def describe_timestep(result):
+    """Return a one-line summary of a stable timestep calculation."""
+    return (f"Timestep {result['timestep']:.3e} s ({result['timesteps_per_frame']} per frame); "
+            f"Rayleigh {result['rayleigh']:.3e} s, Hertz {result['hertz']:.3e} s at {result['collision_velocity']:.3f} m/s")
@@ -0,0 +1,161 @@
+import numpy as np
+from .profiling import count, span
+from .steps import drain
+
+try:
+    from bpy_extras.anim_utils import action_get_channelbag_for_slot
+except ImportError:
+    # Blender < 4.4 keeps the F-curves directly on the action
+    action_get_channelbag_for_slot = None
+
+def _action_fcurves(anim):
+    """Return the F-curves of the action assigned to an animation_data block."""
+    action = anim.action
+    if action is None:
+        return []
+    if action_get_channelbag_for_slot is not None:
+        channelbag = action_get_channelbag_for_slot(action, anim.action_slot)
+        return list(channelbag.fcurves) if channelbag else []
+    return list(action.fcurves)
+
+def _has_delta_transform(obj):
+    """Check whether any delta transform of obj differs from the identity."""
+    return (
+        any(obj.delta_location)
+        or any(obj.delta_rotation_euler)
+        or tuple(obj.delta_rotation_quaternion) != (1.0, 0.0, 0.0, 0.0)
+        or tuple(obj.delta_scale) != (1.0, 1.0, 1.0)
+    )
+
+def can_sample_directly(obj):
+    """Check whether obj's world matrix depends only on its own and its parents' transform F-curves."""
+    while obj is not None:
+        if len(obj.constraints) > 0 or obj.rigid_body is not None:
+            return False
+        if obj.parent is not None and obj.parent_type != 'OBJECT':
+            return False
+        if _has_delta_transform(obj):
+            return False
+        anim = obj.animation_data
+        if anim is not None:
+            if len(anim.drivers) > 0 or len(anim.nla_tracks) > 0:
+                return False
+            if any(fcurve.data_path.startswith("delta_") for fcurve in _action_fcurves(anim)):
+                return False
+        obj = obj.parent
+    return True
+
+def _sample_channel(obj, fcurves, data_path, frames):
+    """Evaluate an animated vector property over frames, falling back to its static value per component."""
+    values = np.tile(np.array(getattr(obj, data_path), dtype=np.float64), (len(frames), 1))
+    for fcurve in fcurves:
+        if fcurve.data_path == data_path and not fcurve.mute:
+            values[:, fcurve.array_index] = [fcurve.evaluate(frame) for frame in frames]
+    return values
+
+def _euler_matrices(angles, order):
+    """Build (n, 3, 3) rotation matrices from Euler angles in Blender's rotation order."""
+    cos, sin = np.cos(angles), np.sin(angles)
+    ones, zeros = np.ones(len(angles)), np.zeros(len(angles))
+    axes = {
+        "X": lambda c, s: [[ones, zeros, zeros], [zeros, c, -s], [zeros, s, c]],
+        "Y": lambda c, s: [[c, zeros, s], [zeros, ones, zeros], [-s, zeros, c]],
+        "Z": lambda c, s: [[c, -s, zeros], [s, c, zeros], [zeros, zeros, ones]],
+    }
+    result = np.broadcast_to(np.eye(3), (len(angles), 3, 3))
+    # "XYZ" applies X first, so it ends up rightmost in the product
+    for axis in order:
+        index = "XYZ".index(axis)
+        rotation = np.moveaxis(np.array(axes[axis](cos[:, index], sin[:, index])), -1, 0)
+        result = rotation @ result
+    return result
+
+def _quaternion_matrices(quats):
+    """Build (n, 3, 3) rotation matrices from (w, x, y, z) quaternions."""
+    norms = np.linalg.norm(quats, axis=1, keepdims=True)
+    w, x, y, z = (quats / np.where(norms > 0, norms, 1.0)).T
+    return np.moveaxis(np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+        [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+        [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)],
+    ]), -1, 0)
+
+def _axis_angle_matrices(axis_angles):
+    """Build (n, 3, 3) rotation matrices from (angle, x, y, z) axis-angle values."""
+    angles = axis_angles[:, 0]
+    axes = axis_angles[:, 1:]
+    norms = np.linalg.norm(axes, axis=1, keepdims=True)
+    axes = axes / np.where(norms > 0, norms, 1.0)
+    half = angles / 2
+    return _quaternion_matrices(np.column_stack((np.cos(half), axes * np.sin(half)[:, None])))
+
+def _sample_basis_matrices(obj, frames):
+    """Evaluate obj's local matrix_basis over frames from its transform F-curves."""
+    anim = obj.animation_data
+    fcurves = _action_fcurves(anim) if anim is not None else []
+
+    location = _sample_channel(obj, fcurves, "location", frames)
+    scale = _sample_channel(obj, fcurves, "scale", frames)
+    if obj.rotation_mode == 'QUATERNION':
+        rotation = _quaternion_matrices(_sample_channel(obj, fcurves, "rotation_quaternion", frames))
+    elif obj.rotation_mode == 'AXIS_ANGLE':
+        rotation = _axis_angle_matrices(_sample_channel(obj, fcurves, "rotation_axis_angle", frames))
+    else:
+        rotation = _euler_matrices(_sample_channel(obj, fcurves, "rotation_euler", frames), obj.rotation_mode)
+
+    basis = np.zeros((len(frames), 4, 4))
+    basis[:, :3, :3] = rotation * scale[:, None, :]
+    basis[:, :3, 3] = location
+    basis[:, 3, 3] = 1.0
+    return basis
+
+def _sample_world_matrices_directly(obj, frames, cache):
+    """Compose obj's world matrices over frames from the F-curves of its parent chain."""
+    if obj.name in cache:
+        return cache[obj.name]
+    world = _sample_basis_matrices(obj, frames)
+    if obj.parent is not None:
+        parent_world = _sample_world_matrices_directly(obj.parent, frames, cache)
+        world = parent_world @ np.array(obj.matrix_parent_inverse) @ world
+    cache[obj.name] = world
+    return world
+
+def sample_world_matrices(scene, objects, frame_start, frame_end):
+    """Sample the world matrices of objects over a frame range; see iter_sample_world_matrices."""
+    return drain(iter_sample_world_matrices(scene, objects, frame_start, frame_end))
+
+def iter_sample_world_matrices(scene, objects, frame_start, frame_end):
+    """Sample the world matrices of objects over a frame range.
+
+    Objects whose motion comes only from transform F-curves are evaluated
+    directly; objects with constraints, drivers or other dependencies fall
+    back to scene.frame_set. Yields (units done, unit count) after each
+    directly sampled object and each fallback frame, and returns an array
+    of shape (frames, objects, 4, 4).
+    """
+    frames = list(range(frame_start, frame_end + 1))
+    matrices = np.zeros((len(frames), len(objects), 4, 4))
+
+    cache = {}
+    direct = [index for index, obj in enumerate(objects) if can_sample_directly(obj)]
+    fallback = [index for index in range(len(objects)) if index not in direct]
+    total = len(direct) + (len(frames) if fallback else 0)
+    for done, index in enumerate(direct, 1):
+        with span(f"sample directly/{objects[index].name}"):
+            matrices[:, index] = _sample_world_matrices_directly(objects[index], frames, cache)
+        yield done, total
+
+    if fallback:
+        current_frame = scene.frame_current
+        try:
+            for frame_index, frame in enumerate(frames):
+                with span("frame_set"):
+                    scene.frame_set(frame)
+                count("frames evaluated")
+                for index in fallback:
+                    matrices[frame_index, index] = np.array(objects[index].matrix_world)
+                yield len(direct) + frame_index + 1, total
+        finally:
+            scene.frame_set(current_frame)
+
+    return matrices
@@ -0,0 +1,105 @@
+import os
+import queue
+import threading
+import subprocess
+
+import bpy
+
+PROGRESS_PREFIX = "LIGGGHTS_PROGRESS"
+
+def report_progress(amount=1):
+    """Tell the parent process that a worker finished some units of work."""
+    print(f"{PROGRESS_PREFIX} {amount}", flush=True)
+
+def saved_blend_path(temp_dir):
+    """Return a .blend path holding the current scene, saving a copy when there are unsaved changes."""
+    if bpy.data.filepath and not bpy.data.is_dirty:
+        return bpy.data.filepath
+    filepath = os.path.join(temp_dir, "liggghts_worker.blend")
+    bpy.ops.wm.save_as_mainfile(filepath=filepath, copy=True)
+    return filepath
+
+def blender_command(blend_path, script_path, script_args):
+    """Build the command line that runs a Python script in a background Blender."""
+    return [
+        bpy.app.binary_path,
+        "--background", blend_path,
+        "--python-exit-code", "1",
+        "--python", script_path,
+        "--", *[str(arg) for arg in script_args],
+    ]
+
+def addon_import_path():
+    """Return the directory and package name that let a worker import this addon."""
+    addon_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.dirname(addon_root), os.path.basename(addon_root)
+
+def _pump_output(process, index, messages):
+    """Forward a worker's progress lines and keep the tail of its output for error reports."""
+    tail = []
+    for line in process.stdout:
+        if line.startswith(PROGRESS_PREFIX):
+            messages.put((index, int(line.split()[1])))
+        else:
+            tail = (tail + [line])[-20:]
+    messages.put((index, None, "".join(tail)))
+
+def iter_blender_workers(commands, poll=0.1):
+    """Run worker commands concurrently, yielding the total units they have reported every poll seconds.
+
+    Returns once every worker has exited. Raises RuntimeError if any
+    worker fails; closing the generator early terminates the workers.
+    """
+    messages = queue.Queue()
+    processes = []
+    finished = False
+    try:
+        for index, command in enumerate(commands):
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            threading.Thread(target=_pump_output, args=(process, index, messages), daemon=True).start()
+            processes.append(process)
+
+        done = 0
+        tails = {}
+        while len(tails) < len(processes):
+            try:
+                message = messages.get(timeout=poll)
+            except queue.Empty:
+                yield done
+                continue
+            if message[1] is None:
+                tails[message[0]] = message[2]
+                continue
+            done += message[1]
+            yield done
+        finished = True
+    finally:
+        if not finished:
+            for process in processes:
+                process.terminate()
+
+    failures = []
+    for index, process in enumerate(processes):
+        if process.wait() != 0:
+            failures.append(f"worker {index} exited with {process.returncode}:\n{tails[index]}")
+    if failures:
+        raise RuntimeError("\n".join(failures))
+
+def run_blender_workers(commands, progress=None):
+    """Run worker commands concurrently and report their combined progress on this thread.
+
+    progress is called with the total number of units reported by all
+    workers so far. Raises RuntimeError if any worker fails.
+    """
+    reported = 0
+    for done in iter_blender_workers(commands):
+        if progress is not None and done != reported:
+            progress(done)
+            reported = done
+
+def split_frames(frame_start, frame_end, chunks):
+    """Split an inclusive frame range into at most `chunks` contiguous inclusive ranges."""
+    frame_count = frame_end - frame_start + 1
+    chunks = max(1, min(chunks, frame_count))
+    bounds = [frame_start + (frame_count * index) // chunks for index in range(chunks + 1)]
+    return [(bounds[index], bounds[index + 1] - 1) for index in range(chunks)]